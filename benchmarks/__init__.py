@@ -0,0 +1,7 @@
+"""
+Benchmarks of the routing demon.
+- topologies: ring, grid, random and scale-free topology generators writing
+configure files in the config_file_reader format
+- run: convergence and throughput measurements in the simulator, appended as
+JSON lines for tracking regressions
+"""
@@ -0,0 +1,191 @@
+"""
+This module runs the convergence and throughput benchmarks in the simulator.
+For every topology and size the routers are started together and run until no
+route has changed for QUIET_PERIOD simulated seconds, then one link fails and
+the routers run until quiet again. Each run reports:
+1: startup_convergence, failure_convergence, simulated seconds from the start
+or the link failure to the last cost or next hop change
+2: startup_packets, startup_bytes, failure_packets, failure_bytes, sent over the
+in-memory network during each phase
+3: cpu_per_update_us, process CPU time per datagram delivered to a router
+4: peak_memory_kb, peak Python memory traced by tracemalloc, or the peak
+resident set size without --trace-memory. Every run is made in a new process
+so the resident set size of one run does not carry over to the next
+5: startup_wrong_routes, failure_wrong_routes, with --verify the number of
+routes which differ from the shortest paths of reference_solver at the end of
+each phase, the verification is not counted in cpu_time
+Results are appended as JSON lines to the output file so runs can be compared
+over time.
+Usage: python -m benchmarks.run [--topology ring grid] [--size 16 64]
+[--seed 1] [--output benchmark_results.jsonl] [--write-configs DIRECTORY]
+[--verify]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+import router
+from simulator import Simulator
+from benchmarks import topologies
+# Longer than a route timeout, so a failed link is noticed before the network
+# counts as quiet
+QUIET_PERIOD = router.GARBAGE_TIMEOUT + router.TIMER_VALUE_FOR_PERIOD_UPDATE
+RUN_STEP = 5
+MAX_SIMULATED_TIME = 1800
+def last_route_change(simulator):
+    """
+    :param simulator:
+    :return: latest last_route_change of all the routers, None if nothing changed
+    """
+    changes = [simulated_router.last_route_change for simulated_router in
+    simulator.routers.values() if simulated_router.last_route_change is not None]
+    return max(changes) if changes else None
+
+def run_until_quiet(simulator, since):
+    """
+    Run until no route changed for QUIET_PERIOD seconds
+    :param simulator:
+    :param since: simulated time the phase started
+    :return: simulated seconds from since to the last route change, None if the
+    network did not settle within MAX_SIMULATED_TIME
+    """
+    while simulator.scheduler.time() - since < MAX_SIMULATED_TIME:
+        simulator.run(RUN_STEP)
+        last_change = last_route_change(simulator)
+        if last_change is None or last_change < since:
+            last_change = since
+        if simulator.scheduler.time() - last_change >= QUIET_PERIOD:
+            return last_change - since
+    return None
+
+def count_wrong_routes(simulator, size, links):
+    """
+    :param simulator:
+    :param size: number of routers
+    :param links: links which are up
+    :return: (number of wrong routes, CPU seconds spent)
+    """
+    # NumPy is only needed with --verify
+    from reference_solver import ReferenceSolver
+    cpu_start = time.process_time()
+    solver = ReferenceSolver(topologies.build_configs(size, links))
+    wrong_routes = len(solver.diff(simulator.routers))
+    return (wrong_routes, time.process_time() - cpu_start)
+
+def run_benchmark(topology, size, seed=None, latency=0.01, trace_memory=False,
+verify=False):
+    """
+    :param topology: one of topologies.TOPOLOGIES
+    :param size: requested number of routers
+    :param seed:
+    :param latency: seconds per link
+    :param trace_memory: measure peak memory with tracemalloc
+    :param verify: check the routing tables with reference_solver
+    :return: dict of results
+    """
+    size, links = topologies.generate(topology, size, seed)
+    configs = topologies.build_configs(size, links)
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    simulator = Simulator(configs, latency=latency, seed=seed)
+    network = simulator.network
+    simulator.start()
+    startup_convergence = run_until_quiet(simulator, 0)
+    startup_packets = network.packets_sent
+    startup_bytes = network.bytes_sent
+    verify_time = 0
+    startup_wrong_routes = failure_wrong_routes = None
+    if verify:
+        startup_wrong_routes, spent = count_wrong_routes(simulator, size, links)
+        verify_time += spent
+    failed_link = random.Random(seed).choice(links) if links else None
+    failure_convergence = None
+    if failed_link is not None:
+        simulator.set_link_loss(failed_link[0], failed_link[1], 1)
+        failure_convergence = run_until_quiet(simulator,
+        simulator.scheduler.time())
+        if verify:
+            failure_wrong_routes, spent = count_wrong_routes(simulator, size,
+            [link for link in links if link is not failed_link])
+            verify_time += spent
+    cpu_time = time.process_time() - cpu_start - verify_time
+    wall_time = time.perf_counter() - wall_start
+    if trace_memory:
+        peak_memory_kb = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    else:
+        peak_memory_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "topology": topology,
+        "routers": size,
+        "links": len(links),
+        "seed": seed,
+        "latency": latency,
+        "failed_link": failed_link[:2] if failed_link is not None else None,
+        "startup_convergence": startup_convergence,
+        "failure_convergence": failure_convergence,
+        "startup_packets": startup_packets,
+        "startup_bytes": startup_bytes,
+        "failure_packets": network.packets_sent - startup_packets,
+        "failure_bytes": network.bytes_sent - startup_bytes,
+        "updates_delivered": network.packets_delivered,
+        "simulated_time": simulator.scheduler.time(),
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "cpu_per_update_us": (cpu_time / network.packets_delivered * 1e6 if
+        network.packets_delivered else None),
+        "peak_memory_kb": peak_memory_kb,
+        "peak_memory_source": "tracemalloc" if trace_memory else "ru_maxrss",
+        "startup_wrong_routes": startup_wrong_routes,
+        "failure_wrong_routes": failure_wrong_routes,
+    }
+
+def run_in_process(*args):
+    """
+    Run one benchmark in a new interpreter, so peak_memory_kb only covers that
+    run
+    :param args: arguments of run_benchmark
+    :return: dict of results
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_benchmark, args)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RIP convergence and "
+    "throughput benchmarks")
+    parser.add_argument("--topology", nargs="+", choices=topologies.TOPOLOGIES,
+    default=list(topologies.TOPOLOGIES))
+    parser.add_argument("--size", nargs="+", type=int, default=[16, 64])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.jsonl",
+    help="JSON lines file the results are appended to, - for stdout only")
+    parser.add_argument("--write-configs", metavar="DIRECTORY",
+    help="also write the configure files of every topology under DIRECTORY")
+    parser.add_argument("--verify", action="store_true",
+    help="check the routing tables against reference_solver, needs NumPy")
+    args = parser.parse_args()
+    for topology in args.topology:
+        for size in args.size:
+            if args.write_configs:
+                routers, links = topologies.generate(topology, size, args.seed)
+                topologies.write_config_files(topologies.build_configs(routers,
+                links), os.path.join(args.write_configs, "{0:s}-{1:d}".format(
+                topology, routers)))
+            result = run_in_process(topology, size, args.seed, args.latency,
+            args.trace_memory, args.verify)
+            line = json.dumps(result, sort_keys=True)
+            print(line)
+            if args.output != "-":
+                with open(args.output, "a") as output_file:
+                    output_file.write(line + "\n")
@@ -0,0 +1,158 @@
+"""
+This module generates topologies for the benchmarks.
+A topology is a list of links (router_a, router_b, cost) between routers
+numbered from 1. build_configs turns it into router configurations in the
+config_file_reader.get_file_info format, giving every direction of every link
+its own input port, and write_config_files writes them as configure files.
+"""
+import os
+import random
+FIRST_PORT = 1024
+LAST_PORT = 64000
+def ring(size, cost=1):
+    """
+    :param size: number of routers
+    :param cost: link cost
+    :return: links
+    """
+    if size < 3:
+        return [(1, 2, cost)] if size == 2 else []
+    return [(router_id, router_id % size + 1, cost) for router_id in
+    range(1, size + 1)]
+
+def grid(rows, columns, cost=1):
+    """
+    :param rows:
+    :param columns:
+    :param cost: link cost
+    :return: links
+    """
+    links = []
+    for row in range(rows):
+        for column in range(columns):
+            router_id = row * columns + column + 1
+            if column + 1 < columns:
+                links.append((router_id, router_id + 1, cost))
+            if row + 1 < rows:
+                links.append((router_id, router_id + columns, cost))
+    return links
+
+def random_graph(size, degree=4, max_cost=1, seed=None):
+    """
+    Connected random topology: a random spanning tree plus random links until
+    the average degree is reached
+    :param size: number of routers
+    :param degree: average number of neighbours
+    :param max_cost: link costs are drawn from 1..max_cost
+    :param seed:
+    :return: links
+    """
+    rng = random.Random(seed)
+    linked = set()
+    links = []
+    def add_link(router_a, router_b):
+        key = (min(router_a, router_b), max(router_a, router_b))
+        if router_a == router_b or key in linked:
+            return
+        linked.add(key)
+        links.append((router_a, router_b, rng.randint(1, max_cost)))
+    for router_id in range(2, size + 1):
+        add_link(router_id, rng.randint(1, router_id - 1))
+    target = max(size - 1, size * degree // 2)
+    attempts = 0
+    while len(links) < target and attempts < 20 * target:
+        add_link(rng.randint(1, size), rng.randint(1, size))
+        attempts += 1
+    return links
+
+def scale_free(size, links_per_router=2, max_cost=1, seed=None):
+    """
+    Barabasi-Albert preferential attachment topology
+    :param size: number of routers
+    :param links_per_router: links added by every new router
+    :param max_cost: link costs are drawn from 1..max_cost
+    :param seed:
+    :return: links
+    """
+    rng = random.Random(seed)
+    links = []
+    # Every router appears once per link end, so a uniform pick from this
+    # list is proportional to degree
+    ends = []
+    for router_id in range(2, size + 1):
+        targets = set()
+        while len(targets) < min(links_per_router, router_id - 1):
+            targets.add(rng.choice(ends) if ends else rng.randint(1,
+            router_id - 1))
+        for target in targets:
+            links.append((router_id, target, rng.randint(1, max_cost)))
+            ends.append(router_id)
+            ends.append(target)
+    return links
+
+def build_configs(size, links, first_port=FIRST_PORT):
+    """
+    :param size: number of routers
+    :param links: list of (router_a, router_b, cost)
+    :param first_port:
+    :return: list of [router_id, input_ports, outputs]
+    """
+    if first_port + 2 * len(links) - 1 > LAST_PORT:
+        raise ValueError("Too many links for the port range")
+    configs = {router_id: [router_id, [], {}] for router_id in range(1,
+    size + 1)}
+    port = first_port
+    for router_a, router_b, cost in links:
+        # router_a listens on port for router_b and on port + 1 the other way
+        configs[router_a][1].append(port)
+        configs[router_b][2][router_a] = (cost, port)
+        configs[router_b][1].append(port + 1)
+        configs[router_a][2][router_b] = (cost, port + 1)
+        port += 2
+    return [configs[router_id] for router_id in range(1, size + 1)]
+
+def format_config(config):
+    """
+    :param config: [router_id, input_ports, outputs]
+    :return: configure file content
+    """
+    router_id, input_ports, outputs = config
+    return "router-id {0:d}\ninput-ports {1:s}\noutputs {2:s}\n".format(
+    router_id, ", ".join(str(port) for port in input_ports),
+    ", ".join("{0:d}-{1:d}-{2:d}".format(port, cost, neighbour) for
+    neighbour, (cost, port) in outputs.items()))
+
+def write_config_files(configs, directory):
+    """
+    Write one configure file per router
+    :param configs:
+    :param directory:
+    :return: list of file names
+    """
+    os.makedirs(directory, exist_ok=True)
+    file_names = []
+    for config in configs:
+        file_name = os.path.join(directory, "conf{0:d}.txt".format(config[0]))
+        with open(file_name, "w") as config_file:
+            config_file.write(format_config(config))
+        file_names.append(file_name)
+    return file_names
+
+def generate(topology, size, seed=None):
+    """
+    :param topology: one of TOPOLOGIES
+    :param size: requested number of routers, a grid is rounded down to a square
+    :param seed:
+    :return: (size, links)
+    """
+    if topology == "ring":
+        return (size, ring(size))
+    if topology == "grid":
+        side = int(size ** 0.5)
+        return (side * side, grid(side, side))
+    if topology == "random":
+        return (size, random_graph(size, seed=seed))
+    if topology == "scale-free":
+        return (size, scale_free(size, seed=seed))
+    raise ValueError("Unknown topology " + topology)
+TOPOLOGIES = ("ring", "grid", "random", "scale-free")
@@ -1,76 +1,162 @@
-import re
-def get_file_info(file_name):
+"""
+This module reads the configure files of the routers.
+A configure file describes one or more routers, each one by three lines:
+router-id 1
+input-ports 1024, 1035, 1036
+outputs 1025-1-2, 1034-5-6, 1037-8-7
+An output is port-metric-router id of a neighbour. Blank lines and lines
+starting with # are ignored, so one topology file can describe a whole network.
+Every line is read once and duplicates are found with sets, so a file is loaded
+in linear time. Errors are raised as ConfigError carrying the file name and the
+line number.
+- read_topology, every router of a file
+- read_config, the only router of a file
+- get_file_info, read_config which prints the error and returns False, kept for
+the callers of the original reader
+"""
+MIN_ROUTER_ID = 1
+MAX_ROUTER_ID = 64000
+MIN_PORT = 1024
+MAX_PORT = 64000
+MIN_METRIC = 1
+MAX_METRIC = 16
+ROUTER_ID_KEYWORD = "router-id"
+INPUT_PORTS_KEYWORD = "input-ports"
+OUTPUTS_KEYWORD = "outputs"
+class ConfigError(ValueError):
+    """
+    An invalid configure file
+    - Fields
+    1: file_name,str
+    2: line_number,int, None if the error is not about one line
+    3: message,str
+    """
+    def __init__(self, file_name, line_number, message):
+        ValueError.__init__(self, file_name, line_number, message)
+        self.file_name = file_name
+        self.line_number = line_number
+        self.message = message
+    def __str__(self):
+        if self.line_number is None:
+            return "{0:s}: {1:s}".format(self.file_name, self.message)
+        return "{0:s}:{1:d}: {2:s}".format(self.file_name, self.line_number,
+        self.message)
+def parse_int(text, minimum, maximum, name, file_name, line_number):
+    """
+    :param text:
+    :param minimum:
+    :param maximum:
+    :param name: what the value is, used in the error message
+    :param file_name:
+    :param line_number:
+    :return: int
+    """
     try:
-        config_file = open(file_name)
-    except:
-        print("ERROR: Cannot find the file!")
-        return False
-    config_file_read = config_file.read()
-    config_file_list = config_file_read.splitlines()
-    if(len(config_file_list) != 3):
-        print("ERROR: Configure file is incomplete!")
-        return False
-    if("router-id" not in config_file_list[0]):
-        print("ERROR: Router ID part is not in the configure file!")
-        return False
-    if("input-ports" not in config_file_list[1]):
-        print("ERROR: input ports part is not in the configure file!")
-        return False
-    if("outputs" not in config_file_list[2]):
-        print("ERROR: Outputs part is not in the configure file!")
-        return False
+        value = int(text)
+    except ValueError:
+        raise ConfigError(file_name, line_number, "{0:s} is not a integer "
+        "value: {1:s}".format(name, text))
+    if(value < minimum or value > maximum):
+        raise ConfigError(file_name, line_number, "{0:s} must between {1:d} and "
+        "{2:d}: {3:d}".format(name, minimum, maximum, value))
+    return value
+def read_topology(file_name):
+    """
+    Read every router of a configure file
+    :param file_name:
+    :return: dict: {router_id: [router_id, input_ports, outputs]} in the order
+    of the file, outputs is a dict: {router_id: (metric, port)}
+    """
     try:
-        router_id = int(config_file_list[0].split()[1])
-    except:
-        print("ERROR: Router ID is not a integer value!")
-        return False
-    if(router_id < 1 or router_id > 64000):
-        print("ERROR: Router id must between 1 and 64000!")
-        return False
-    inputs_strings = re.split(' |, ', config_file_list[1])
-    input_ports = []
-    for inputs_string in inputs_strings[1:]:
-        try:
-            input_port = int(inputs_string)
-        except:
-            print("ERROR: Input port is not a integer value!")
-            return False
-        if(input_port <1024 or input_port > 64000):
-            print("ERROR: Input port number must between 1024 and 64000!")
-            return False
-        elif(input_port in input_ports):
-            print("ERROR: Input port number already exists!")
-            return False
+        with open(file_name) as config_file:
+            lines = config_file.read().splitlines()
+    except OSError as error:
+        raise ConfigError(file_name, None, "Cannot read the file: {0}".format(
+        error.strerror))
+    routers = {}
+    # Input port -> router id, an input port is bound by exactly one router
+    bound_ports = {}
+    config = None
+    expected = ROUTER_ID_KEYWORD
+    for line_number, line in enumerate(lines, 1):
+        fields = line.replace(",", " ").split()
+        if not fields or fields[0].startswith("#"):
+            continue
+        keyword = fields[0]
+        if keyword != expected:
+            raise ConfigError(file_name, line_number, "Expected {0:s} but "
+            "found {1:s}".format(expected, keyword))
+        if keyword == ROUTER_ID_KEYWORD:
+            if len(fields) != 2:
+                raise ConfigError(file_name, line_number, "router-id takes "
+                "one router id")
+            router_id = parse_int(fields[1], MIN_ROUTER_ID, MAX_ROUTER_ID,
+            "Router ID", file_name, line_number)
+            if router_id in routers:
+                raise ConfigError(file_name, line_number, "Router ID {0:d} "
+                "already exists".format(router_id))
+            config = [router_id, [], {}]
+            routers[router_id] = config
+            expected = INPUT_PORTS_KEYWORD
+        elif keyword == INPUT_PORTS_KEYWORD:
+            for field in fields[1:]:
+                input_port = parse_int(field, MIN_PORT, MAX_PORT,
+                "Input port number", file_name, line_number)
+                if input_port in bound_ports:
+                    raise ConfigError(file_name, line_number, "Input port "
+                    "number {0:d} already exists".format(input_port))
+                bound_ports[input_port] = config[0]
+                config[1].append(input_port)
+            expected = OUTPUTS_KEYWORD
         else:
-            input_ports.append(input_port)
-    outputs_strings = re.split(' |, ', config_file_list[2])
-    outputs = {}
-    for outputs_string in outputs_strings[1:]:
-        outputs_info = re.split('-', outputs_string)
-        try:
-            output_port = int(outputs_info[0])
-        except:
-            print("ERROR: Onput port is not a integer value!")
-            return False
-        if(output_port <1024 or output_port > 64000):
-            print("ERROR: Output port number must between 1024 and 64000!")
-            return False
-        for router_id_output in outputs.keys():
-            if(output_port == outputs[router_id_output][1]):
-                print("ERROR: Output port already exists!")
-                return False
-        try:
-            metric_value = int(outputs_info[1])
-        except:
-            print("ERROR: metric value is not a integer value!")
-            return False
-        try:
-            output_router_id = int(outputs_info[2])
-        except:
-            print("ERROR: Output router ID is not a integer value!")
-            return False
-        if(output_router_id in outputs.keys()):
-            print("ERROR: Output router ID is exists!")
-            return False
-        outputs[output_router_id] = (metric_value, output_port)
-    return [router_id, input_ports, outputs]
\ No newline at end of file
+            output_ports = set()
+            for field in fields[1:]:
+                output_info = field.split("-")
+                if len(output_info) != 3:
+                    raise ConfigError(file_name, line_number, "Output must be "
+                    "port-metric-router id: {0:s}".format(field))
+                output_port = parse_int(output_info[0], MIN_PORT, MAX_PORT,
+                "Output port number", file_name, line_number)
+                metric_value = parse_int(output_info[1], MIN_METRIC, MAX_METRIC,
+                "Metric value", file_name, line_number)
+                output_router_id = parse_int(output_info[2], MIN_ROUTER_ID,
+                MAX_ROUTER_ID, "Output router ID", file_name, line_number)
+                if output_port in output_ports:
+                    raise ConfigError(file_name, line_number, "Output port "
+                    "{0:d} already exists".format(output_port))
+                if output_router_id == config[0]:
+                    raise ConfigError(file_name, line_number, "Output router ID "
+                    "{0:d} is the router itself".format(output_router_id))
+                if output_router_id in config[2]:
+                    raise ConfigError(file_name, line_number, "Output router ID "
+                    "{0:d} already exists".format(output_router_id))
+                output_ports.add(output_port)
+                config[2][output_router_id] = (metric_value, output_port)
+            expected = ROUTER_ID_KEYWORD
+    if expected != ROUTER_ID_KEYWORD:
+        raise ConfigError(file_name, len(lines), "Configure file is incomplete, "
+        "{0:s} is missing".format(expected))
+    if not routers:
+        raise ConfigError(file_name, None, "No router in the configure file")
+    return routers
+def read_config(file_name):
+    """
+    Read a configure file describing one router
+    :param file_name:
+    :return: [router_id, input_ports, outputs]
+    """
+    routers = read_topology(file_name)
+    if len(routers) != 1:
+        raise ConfigError(file_name, None, "{0:d} routers in the configure "
+        "file, expected one".format(len(routers)))
+    return next(iter(routers.values()))
+def get_file_info(file_name):
+    """
+    :param file_name:
+    :return: [router_id, input_ports, outputs], False if the file is invalid
+    """
+    try:
+        return read_config(file_name)
+    except ConfigError as error:
+        print("ERROR: {0}".format(error))
+        return False
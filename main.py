@@ -1,15 +1,104 @@
 import config_file_reader
 import router
+import metrics
+import rip_logging
+import argparse
+import logging
+import signal
 import sys
+def load_config(args):
+    """
+    Read the configuration of this router from the configure file or from the
+    topology file
+    :param args: parsed command line
+    :return: [router_id, input_ports, outputs]
+    :raise config_file_reader.ConfigError:
+    """
+    if args.topology is None:
+        return config_file_reader.read_config(args.config_file)
+    routers = config_file_reader.read_topology(args.topology)
+    if args.router_id not in routers:
+        raise config_file_reader.ConfigError(args.topology, None, "Router ID "
+        "{0:d} is not in the topology file".format(args.router_id))
+    return routers[args.router_id]
+def reload_config(running_router, args):
+    """
+    Read the configuration again on SIGHUP and apply the differences to the
+    running router. An invalid configuration is logged and ignored.
+    :param running_router:
+    :param args: parsed command line
+    """
+    try:
+        router_id, input_ports, outputs = load_config(args)
+    except config_file_reader.ConfigError as error:
+        running_router.logger.error("Configuration not reloaded: %s", error)
+        return
+    if router_id != running_router.router_id:
+        running_router.logger.error("Configuration not reloaded: the router ID "
+        "can not change from %d to %d", running_router.router_id, router_id)
+        return
+    running_router.apply_config(input_ports, outputs)
 if __name__ == '__main__':
-    input_file_name = sys.argv[1]
-    file_list = config_file_reader.get_file_info(input_file_name)
-    if(file_list != False):
-        router_id = file_list[0]
-        input_ports = file_list[1]
-        outputs = file_list[2]
-        new_router = router.Router(router_id,input_ports,outputs)
-        print("++++++++++++++++++++++++++++++")
-        print("Welcome to RIP version2.")
-        print("++++++++++++++++++++++++++++++")
-        new_router.switch_on_router()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="RIP version2 routing demon, "
+    "send SIGHUP to reload the configuration")
+    parser.add_argument("config_file", nargs="?")
+    parser.add_argument("--topology", metavar="FILE",
+    help="read the configuration of --router-id from a topology file "
+    "describing many routers instead of a configure file")
+    parser.add_argument("--router-id", type=int)
+    parser.add_argument("--legacy-format", action="store_true",
+    help="send packets in the old ASCII format")
+    parser.add_argument("--triggered-update-delay", nargs=2, type=float,
+    metavar=("MIN", "MAX"), default=(router.TRIGGERED_UPDATE_MIN_DELAY,
+    router.TRIGGERED_UPDATE_MAX_DELAY),
+    help="seconds of holdoff between two triggered updates")
+    parser.add_argument("--log-level", default="INFO",
+    choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+    help="DEBUG also logs the routing tables")
+    parser.add_argument("--table-dump-interval", type=float,
+    default=rip_logging.TABLE_DUMP_INTERVAL,
+    help="minimum seconds between two routing table dumps")
+    parser.add_argument("--stats-port", type=int,
+    help="serve the metrics on this UDP port of 127.0.0.1, query it with "
+    "python metrics.py PORT")
+    parser.add_argument("--stats-interval", type=float,
+    help="log the metrics every this many seconds")
+    parser.add_argument("--snapshot", metavar="FILE",
+    help="save the routing table to FILE and restore it on restart")
+    args = parser.parse_args()
+    min_delay, max_delay = args.triggered_update_delay
+    if(min_delay < 0 or min_delay > max_delay):
+        parser.error("triggered update delay must satisfy 0 <= MIN <= MAX")
+    if((args.config_file is None) == (args.topology is None) or
+    (args.topology is None) != (args.router_id is None)):
+        parser.error("give either a configure file or --topology and "
+        "--router-id")
+    try:
+        file_list = load_config(args)
+    except config_file_reader.ConfigError as error:
+        print("ERROR: {0}".format(error))
+        sys.exit(1)
+    router_id = file_list[0]
+    input_ports = file_list[1]
+    outputs = file_list[2]
+    new_router = router.Router(router_id,input_ports,outputs,
+    legacy_format=args.legacy_format,
+    triggered_update_delay=(min_delay, max_delay),
+    table_dump_interval=args.table_dump_interval,
+    stats_interval=args.stats_interval, snapshot_file=args.snapshot)
+    stats_server = None
+    if args.stats_port is not None:
+        stats_server = metrics.StatsServer(new_router, args.stats_port)
+    if hasattr(signal, "SIGHUP"):
+        new_router.scheduler.add_signal_handler(signal.SIGHUP, reload_config,
+        new_router, args)
+    print("++++++++++++++++++++++++++++++")
+    print("Welcome to RIP version2.")
+    print("++++++++++++++++++++++++++++++")
+    log_listener = rip_logging.setup_logging(getattr(logging, args.log_level))
+    try:
+        new_router.switch_on_router()
+    finally:
+        if stats_server is not None:
+            stats_server.close()
+        log_listener.stop()
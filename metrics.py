@@ -0,0 +1,240 @@
+"""
+This module describe the runtime metrics of one router.
+- RouterMetrics, counters of the packets received, sent and dropped on every
+port, of the packets which failed validation, and histograms of the time spent
+in calculate_routing_table, advertise_routing_table and timer_for_router
+- StatsServer, a UDP socket on 127.0.0.1 registered on the router's scheduler.
+Each datagram is one command and is answered with one datagram:
+"stats": the snapshot of the metrics as JSON
+"reset": clear the counters and histograms
+"profile start": start cProfile on the event loop thread
+"profile stop": stop cProfile and reply with the PROFILE_LINES most expensive
+functions
+Usage: python metrics.py PORT [stats|reset|profile start|profile stop]
+"""
+import bisect
+import collections
+import cProfile
+import io
+import json
+import pstats
+import socket
+import sys
+import rip_packet
+# Upper bounds of the histogram buckets in seconds, the last bucket is unbounded
+HISTOGRAM_BOUNDS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+PROFILE_LINES = 40
+STATS_REPLY_SIZE = 65507
+STATS_CLIENT_TIMEOUT = 2
+class Histogram:
+    """
+    Distribution of durations in fixed buckets
+    - Fields
+    1: counts,list, number of durations in each bucket of HISTOGRAM_BOUNDS,
+    plus one for the longer durations
+    2: count,int
+    3: total,float, seconds
+    4: maximum,float, seconds
+    """
+    __slots__ = ("counts", "count", "total", "maximum")
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+    def observe(self, seconds):
+        """
+        :param seconds:
+        """
+        self.counts[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+    def snapshot(self):
+        """
+        :return: dict, the durations in microseconds and the buckets as
+        [upper bound in microseconds or None, count]
+        """
+        return {
+            "count": self.count,
+            "total_us": round(self.total * 1e6),
+            "mean_us": round(self.total * 1e6 / self.count, 1) if self.count else None,
+            "max_us": round(self.maximum * 1e6, 1),
+            "buckets": [[round(bound * 1e6) if bound is not None else None, count]
+            for bound, count in zip(HISTOGRAM_BOUNDS + (None,), self.counts)
+            if count],
+        }
+class RouterMetrics:
+    """
+    - Fields
+    1: received_packets, received_bytes,Counter: {port: int}, by input port
+    2: sent_packets, sent_bytes,Counter: {port: int}, by neighbour input port
+    3: dropped,Counter: {port: int}, packets received on a port which were
+    invalid or could not be forwarded
+    4: validation_failures,int, packets rejected by incoming_packet_check
+    5: forwarded,int, packets forwarded to another router
+    6: unroutable,int, packets which could not be forwarded since their
+    destination is unreachable
+    7: timings,dict: {name: Histogram}
+    """
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        """
+        Clear every counter and histogram
+        """
+        self.received_packets = collections.Counter()
+        self.received_bytes = collections.Counter()
+        self.sent_packets = collections.Counter()
+        self.sent_bytes = collections.Counter()
+        self.dropped = collections.Counter()
+        self.validation_failures = 0
+        self.forwarded = 0
+        self.unroutable = 0
+        self.timings = collections.defaultdict(Histogram)
+    def observe(self, name, seconds):
+        """
+        :param name: name of the timed function
+        :param seconds:
+        """
+        self.timings[name].observe(seconds)
+    def snapshot(self, router):
+        """
+        :param router: the router these metrics belong to
+        :return: dict which can be encoded as JSON
+        """
+        ports = sorted(set(self.received_packets) | set(self.sent_packets) |
+        set(self.dropped))
+        return {
+            "router_id": router.router_id,
+            "time": router.scheduler.time(),
+            "routes": len(router.routing_table),
+            "reachable_routes": sum(1 for _, route in router.routing_table.items()
+            if route.cost < rip_packet.MAX_METRIC),
+            "periodic_updates_sent": router.periodic_updates_sent,
+            "triggered_updates_sent": router.triggered_updates_sent,
+            "triggered_updates_suppressed": router.triggered_updates_suppressed,
+            "requests_sent": router.requests_sent,
+            "requests_answered": router.requests_answered,
+            "validation_failures": self.validation_failures,
+            "forwarded": self.forwarded,
+            "unroutable": self.unroutable,
+            "ports": {str(port): {
+                "received_packets": self.received_packets[port],
+                "received_bytes": self.received_bytes[port],
+                "sent_packets": self.sent_packets[port],
+                "sent_bytes": self.sent_bytes[port],
+                "dropped": self.dropped[port],
+            } for port in ports},
+            "timings": {name: histogram.snapshot() for name, histogram in
+            sorted(self.timings.items())},
+        }
+class Profiler:
+    """
+    cProfile which can be switched on and off while the router runs. It
+    profiles the thread which starts it, the event loop thread when it is
+    started by a StatsServer command.
+    """
+    def __init__(self):
+        self.profile = None
+    def start(self):
+        """
+        :return: str, reply to the command
+        """
+        if self.profile is not None:
+            return "profiler already running"
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return "profiler started"
+    def stop(self, lines=PROFILE_LINES):
+        """
+        :param lines: number of functions reported
+        :return: str, the most expensive functions by cumulative time
+        """
+        if self.profile is None:
+            return "profiler not running"
+        self.profile.disable()
+        output = io.StringIO()
+        pstats.Stats(self.profile, stream=output).sort_stats(
+        "cumulative").print_stats(lines)
+        self.profile = None
+        return output.getvalue()
+class StatsServer:
+    """
+    - Basic fields
+    1: router, the router whose metrics are served
+    2: socket,socket, non-blocking UDP socket bound to (address, port) and
+    registered on the router's scheduler
+    3: profiler,Profiler
+    """
+    def __init__(self, router, port, address="127.0.0.1"):
+        self.router = router
+        self.profiler = Profiler()
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((address, port))
+        self.socket.setblocking(False)
+        self.router.scheduler.add_reader(self.socket, self.receive_commands)
+    def handle_command(self, command):
+        """
+        :param command: str
+        :return: str, the reply
+        """
+        command = " ".join(command.split()).lower()
+        if command == "stats":
+            return json.dumps(self.router.metrics.snapshot(self.router),
+            sort_keys=True)
+        if command == "reset":
+            self.router.metrics.reset()
+            return "metrics reset"
+        if command == "profile start":
+            return self.profiler.start()
+        if command == "profile stop":
+            return self.profiler.stop()
+        return "unknown command, use stats, reset, profile start or profile stop"
+    def receive_commands(self):
+        """
+        Answer every command waiting on the socket
+        """
+        while True:
+            try:
+                command, address = self.socket.recvfrom(STATS_REPLY_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionError:
+                continue
+            reply = self.handle_command(command.decode("utf-8", "replace"))
+            try:
+                self.socket.sendto(reply.encode("utf-8")[:STATS_REPLY_SIZE],
+                address)
+            except OSError:
+                pass
+    def close(self):
+        """
+        Stop the profiler and close the socket
+        """
+        self.profiler.stop()
+        self.router.scheduler.remove_reader(self.socket)
+        self.socket.close()
+def query(port, command="stats", address="127.0.0.1"):
+    """
+    Send one command to a StatsServer
+    :param port:
+    :param command:
+    :param address:
+    :return: str, the reply
+    """
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        client.settimeout(STATS_CLIENT_TIMEOUT)
+        client.sendto(command.encode("utf-8"), (address, port))
+        return client.recv(STATS_REPLY_SIZE).decode("utf-8")
+    finally:
+        client.close()
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python metrics.py PORT [stats|reset|profile start|"
+        "profile stop]")
+        sys.exit(1)
+    print(query(int(sys.argv[1]), " ".join(sys.argv[2:]) or "stats"))
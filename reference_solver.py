@@ -0,0 +1,239 @@
+"""
+This module computes the routing tables a converged network should have and
+checks the routing tables of simulated routers against them.
+The topology is read from configs in the config_file_reader format. A link
+between two routers is used only when both configs list each other, with the
+cost the sending router's config gives it. All-pairs shortest paths are
+computed with a batched Bellman-Ford over the links, one block of destinations
+at a time, with costs capped at MAX_LINK_COST. Since every link costs at least
+1 a route cheaper than MAX_LINK_COST has at most MAX_LINK_COST - 1 hops, so at
+most that many rounds are needed. A round relaxes the first link of every
+router, then the second one and so on, each step being one gather over the
+whole block.
+NumPy is needed by this module only, it is not needed to run the routers.
+Usage: python reference_solver.py conf1.txt conf2.txt ... [--duration 120]
+"""
+import argparse
+import collections
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from router import MAX_LINK_COST
+# Upper bound of links * destinations relaxed at once, about 16MB per round
+BLOCK_ELEMENTS = 1 << 24
+Mismatch = collections.namedtuple("Mismatch", ["router_id", "dst",
+"expected_cost", "cost", "next_hop"])
+class ReferenceSolver:
+    """
+    - Basic fields
+    1: router_ids,numpy array, sorted id of every router, the index of a router
+    in this array is its row and column in costs
+    2: link_sources, link_targets, link_costs,numpy arrays, one entry per
+    direction of every link, sorted by source index
+    3: link_slots,list: [(sources, targets, costs)], the k-th link of every
+    router having more than k links, relaxed together
+    4: costs,numpy array: [source, destination], uint8 cost of the shortest
+    path, MAX_LINK_COST if the destination is unreachable. None until solve()
+    """
+    def __init__(self, configs, block_size=None):
+        """
+        :param configs: list of [router_id, input_ports, outputs] as returned by
+        config_file_reader.get_file_info
+        :param block_size: destinations relaxed at once, None to derive it from
+        BLOCK_ELEMENTS
+        """
+        if np is None:
+            raise ImportError("The reference solver needs NumPy")
+        outputs = {}
+        for router_id, _, router_outputs in configs:
+            if router_id in outputs:
+                raise ValueError("Router ID {0:d} is used twice".format(router_id))
+            outputs[router_id] = router_outputs
+        self.router_ids = np.array(sorted(outputs.keys()), dtype=np.int64)
+        sources = []
+        targets = []
+        link_costs = []
+        for router_id, router_outputs in outputs.items():
+            for neighbour, (cost, _) in router_outputs.items():
+                if router_id in outputs.get(neighbour, ()):
+                    sources.append(router_id)
+                    targets.append(neighbour)
+                    link_costs.append(min(cost, MAX_LINK_COST))
+        sources = self.index_of(np.array(sources, dtype=np.int64))
+        order = np.argsort(sources, kind="stable")
+        self.link_sources = sources[order]
+        self.link_targets = self.index_of(np.array(targets, dtype=np.int64))[order]
+        self.link_costs = np.array(link_costs, dtype=np.uint8)[order]
+        self.link_slots = []
+        ranks = (np.arange(len(self.link_sources)) - np.searchsorted(
+        self.link_sources, self.link_sources))
+        order = np.argsort(ranks, kind="stable")
+        bounds = np.searchsorted(ranks[order], np.arange(ranks.max() + 2 if
+        len(ranks) else 1))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            slot = order[first:last]
+            self.link_slots.append((self.link_sources[slot],
+            self.link_targets[slot], self.link_costs[slot][:, None]))
+        if block_size is None:
+            block_size = BLOCK_ELEMENTS // max(1, len(self.link_sources))
+        self.block_size = max(1, min(block_size, len(self.router_ids)))
+        self.costs = None
+    def index_of(self, router_ids):
+        """
+        :param router_ids: numpy array of router ids
+        :return: numpy array of their indexes, -1 for unknown ids
+        """
+        if not len(self.router_ids):
+            return np.full(len(router_ids), -1, dtype=np.int64)
+        indexes = np.minimum(np.searchsorted(self.router_ids, router_ids),
+        len(self.router_ids) - 1)
+        indexes[self.router_ids[indexes] != router_ids] = -1
+        return indexes
+    def solve(self):
+        """
+        Compute the cost of the shortest path between every pair of routers
+        :return: costs
+        """
+        size = len(self.router_ids)
+        costs = np.empty((size, size), dtype=np.uint8)
+        for start in range(0, size, self.block_size):
+            stop = min(start + self.block_size, size)
+            # Costs of every router to the destinations start..stop-1
+            block = np.full((size, stop - start), MAX_LINK_COST, dtype=np.uint8)
+            block[np.arange(start, stop), np.arange(stop - start)] = 0
+            for _ in range(MAX_LINK_COST - 1):
+                previous = block.copy()
+                for sources, targets, link_costs in self.link_slots:
+                    through = block[targets]
+                    through += link_costs
+                    block[sources] = np.minimum(block[sources], through)
+                np.minimum(block, MAX_LINK_COST, out=block)
+                if np.array_equal(previous, block):
+                    break
+            costs[:, start:stop] = block
+        self.costs = costs
+        return costs
+    def cost(self, router_a, router_b):
+        """
+        :param router_a:
+        :param router_b:
+        :return: cost of the shortest path from router_a to router_b
+        """
+        if self.costs is None:
+            self.solve()
+        index_a, index_b = self.index_of(np.array([router_a, router_b],
+        dtype=np.int64))
+        if index_a < 0 or index_b < 0:
+            return MAX_LINK_COST
+        return int(self.costs[index_a, index_b])
+    def route_arrays(self, routers):
+        """
+        Flatten the routing tables of the routers
+        :param routers: dict: {router_id: Router}
+        :return: (router_id, dst, cost, next_hop) numpy arrays, one entry per
+        route
+        """
+        owners = []
+        dsts = []
+        route_costs = []
+        next_hops = []
+        for router_id, checked_router in routers.items():
+            routing_table = checked_router.routing_table
+            owners.extend([router_id] * len(routing_table))
+            for dst, route in routing_table.items():
+                dsts.append(dst)
+                route_costs.append(route.cost)
+                next_hops.append(route.next_hop)
+        return (np.array(owners, dtype=np.int64), np.array(dsts, dtype=np.int64),
+        np.array(route_costs, dtype=np.int64), np.array(next_hops, dtype=np.int64))
+    def diff(self, routers):
+        """
+        Compare the routing table of every router with the shortest paths.
+        A route is wrong when its cost differs from the shortest path, or when
+        its next hop is not a neighbour on a shortest path. A reachable
+        destination without a route is reported with cost None, unreachable
+        destinations may have no route or a route with cost MAX_LINK_COST.
+        :param routers: dict: {router_id: Router}
+        :return: list of Mismatch sorted by router_id and dst
+        """
+        if self.costs is None:
+            self.solve()
+        size = len(self.router_ids)
+        owners, dsts, route_costs, next_hops = self.route_arrays(routers)
+        route_costs = np.minimum(route_costs, MAX_LINK_COST)
+        owner_indexes = self.index_of(owners)
+        dst_indexes = self.index_of(dsts)
+        hop_indexes = self.index_of(next_hops)
+        known = (owner_indexes >= 0) & (dst_indexes >= 0)
+        expected = np.full(len(owners), MAX_LINK_COST, dtype=np.int64)
+        expected[known] = self.costs[owner_indexes[known], dst_indexes[known]]
+        wrong = route_costs != expected
+        # The next hop of a reachable route must be the router itself for the
+        # route to itself, or a neighbour whose link cost plus its own shortest
+        # path adds up to the route cost
+        reachable = ~wrong & (expected < MAX_LINK_COST)
+        to_itself = reachable & (owner_indexes == dst_indexes)
+        wrong |= to_itself & (hop_indexes != owner_indexes)
+        through = reachable & ~to_itself
+        link_keys = self.link_sources * size + self.link_targets
+        order = np.argsort(link_keys)
+        link_keys = link_keys[order]
+        link_costs = self.link_costs[order].astype(np.int64)
+        hop_keys = np.where(hop_indexes >= 0, owner_indexes * size + hop_indexes,
+        -1)
+        positions = np.minimum(np.searchsorted(link_keys, hop_keys),
+        max(0, len(link_keys) - 1))
+        if len(link_keys):
+            is_link = (hop_keys >= 0) & (link_keys[positions] == hop_keys)
+        else:
+            is_link = np.zeros(len(owners), dtype=bool)
+        hop_costs = np.full(len(owners), MAX_LINK_COST, dtype=np.int64)
+        on_path = through & is_link
+        hop_costs[on_path] = (link_costs[positions[on_path]] + self.costs[
+        hop_indexes[on_path], dst_indexes[on_path]])
+        wrong |= through & (hop_costs != expected)
+        mismatches = [Mismatch(*values) for values in zip(owners[wrong].tolist(),
+        dsts[wrong].tolist(), expected[wrong].tolist(),
+        route_costs[wrong].tolist(), next_hops[wrong].tolist())]
+        # Reachable destinations which are missing from the routing tables,
+        # only the routers with fewer reachable routes than expected are
+        # searched
+        checked = self.index_of(np.array(list(routers.keys()), dtype=np.int64))
+        checked = checked[checked >= 0]
+        routed = np.bincount(owner_indexes[known & (expected < MAX_LINK_COST)],
+        minlength=size)
+        reachable_count = (self.costs[checked] < MAX_LINK_COST).sum(axis=1)
+        for index in checked[routed[checked] < reachable_count].tolist():
+            present = np.zeros(size, dtype=bool)
+            present[dst_indexes[known & (owner_indexes == index)]] = True
+            missing = np.nonzero(~present & (self.costs[index] < MAX_LINK_COST))[0]
+            router_id = int(self.router_ids[index])
+            for dst_index in missing.tolist():
+                mismatches.append(Mismatch(router_id, int(self.router_ids[
+                dst_index]), int(self.costs[index, dst_index]), None, None))
+        mismatches.sort(key=lambda mismatch: (mismatch.router_id, mismatch.dst))
+        return mismatches
+if __name__ == '__main__':
+    from simulator import Simulator, SIMULATION_DURATION
+    parser = argparse.ArgumentParser(description="Simulate the routers and "
+    "check their routing tables against the shortest paths")
+    parser.add_argument("config_files", nargs="+")
+    parser.add_argument("--duration", type=float, default=SIMULATION_DURATION,
+    help="simulated seconds")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    simulator = Simulator.from_config_files(args.config_files, seed=args.seed)
+    solver = ReferenceSolver([[router_id, simulated_router.input_ports,
+    simulated_router.output_ports] for router_id, simulated_router in
+    simulator.routers.items()])
+    simulator.start()
+    simulator.run(args.duration)
+    mismatches = solver.diff(simulator.routers)
+    for mismatch in mismatches:
+        print("Router {0:d} to {1:d}: expected cost {2:d}, has {3}".format(
+        mismatch.router_id, mismatch.dst, mismatch.expected_cost,
+        "no route" if mismatch.cost is None else "cost {0:d} via {1:d}".format(
+        mismatch.cost, mismatch.next_hop)))
+    print("{0:d} routers checked, {1:d} wrong routes".format(
+    len(simulator.routers), len(mismatches)))
@@ -0,0 +1,89 @@
+"""
+This module describe the logging of the routing demon.
+Records are put on a bounded queue by the event loop thread and written to
+stdout by one background writer thread, so a slow terminal or pipe never blocks
+the packet path. When the queue is full new records are dropped and counted.
+Routing table dumps are logged at DEBUG level as a RoutingTableDump, a snapshot
+of the rows which is only formatted by the writer thread.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+LOG_QUEUE_SIZE = 10000
+TABLE_DUMP_INTERVAL = 1.0
+TABLE_LINE = "-"*55
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler which never blocks: records are dropped when the queue is
+    full, and are handed over unformatted so the writer thread formats them.
+    """
+    def __init__(self, log_queue):
+        logging.handlers.QueueHandler.__init__(self, log_queue)
+        self.dropped = 0
+    def prepare(self, record):
+        return record
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+class RoutingTableDump:
+    """
+    Snapshot of a routing table, formatted like the original table printout
+    when the record is written.
+    - Fields
+    1: title,str
+    2: rows,list: [(dst, cst, nexthop, g_timeout, d_timeout)]
+    """
+    __slots__ = ("title", "rows")
+    def __init__(self, title, rows):
+        self.title = title
+        self.rows = rows
+    def __str__(self):
+        lines = [self.title, TABLE_LINE,
+        "{0:1s}{1:9s}{2:1s}{3:9s}{4:1s}{5:9s}{6:1s}{7:10s}{8:1s}{9:10s}{10:1s}".format("|", "Dst", "|", "Cst", "|","Hop", "|", "Timeout", "|", "Garbage Collection", "|"),
+        TABLE_LINE]
+        for dst, cost, hop, g_timeout, d_timeout in self.rows:
+            lines.append("{0:1s}{1:9d}{2:1s}{3:9d}{4:1s}{5:9d}{6:1s}{7:10d}{8:1s}{9:10d}{10:1s}".format("|", dst, "|", cost, "|", hop, "|", g_timeout, "|", d_timeout , "|"))
+            lines.append(TABLE_LINE)
+        return "\n".join(lines)
+class RateLimiter:
+    """
+    Allow an action at most once per interval seconds of the given clock
+    """
+    def __init__(self, interval, clock):
+        self.interval = interval
+        self.clock = clock
+        self.next_allowed = None
+        self.suppressed = 0
+    def allow(self):
+        """
+        :return: bool, True if the action may run now
+        """
+        now = self.clock()
+        if self.next_allowed is not None and now < self.next_allowed:
+            self.suppressed += 1
+            return False
+        self.next_allowed = now + self.interval
+        return True
+def setup_logging(level=logging.INFO, queue_size=LOG_QUEUE_SIZE, stream=None):
+    """
+    Route every "rip" logger through a bounded queue to a background writer
+    thread
+    :param level:
+    :param queue_size:
+    :param stream: output stream, stdout if it is None
+    :return: QueueListener, call stop() on exit to flush the queue
+    """
+    log_queue = queue.Queue(maxsize=queue_size)
+    writer = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    writer.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, writer)
+    logger = logging.getLogger("rip")
+    logger.handlers = [DroppingQueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
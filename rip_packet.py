@@ -0,0 +1,258 @@
+"""
+This module describe the RIP packet formats exchanged between routers.
+- Binary format (default), in the style of RFC 2453
+1: header, 6 bytes: command (1 byte), version (1 byte), source router id
+(2 bytes), destination router id (2 bytes)
+2: route entries, 8 bytes each: address family (2 bytes), destination router
+id (2 bytes), next hop router id (2 bytes), metric (2 bytes)
+At most MAX_ROUTE_ENTRIES route entries are carried by one datagram, larger
+routing tables are split across several datagrams.
+- Legacy format
+The header is written as a 40 character bitstring (4 bits version, 16 bits
+source router id, 16 bits destination router id, 4 bits command) followed by
+the routing table written as str(dict). It is kept so that routers which still
+speak the old format can be mixed with routers speaking the binary format.
+"""
+import struct
+import ast
+RIP_VERSION = 2
+HEADER_FORMAT = struct.Struct("!BBHH")
+ROUTE_ENTRY_FORMAT = struct.Struct("!HHHH")
+ADDRESS_FAMILY_ROUTER_ID = 2
+MAX_ROUTE_ENTRIES = 25
+MAX_PACKET_SIZE = 65535
+LENGTH_VERSION_NUM = 4
+LENGTH_SOURCE_ROUTER_ID = 16
+LENGTH_DESTINATION_ROUTER_ID = 16
+LENGTH_COMMAND = 4
+LENGTH_LEGACY_HEADER = (LENGTH_VERSION_NUM + LENGTH_SOURCE_ROUTER_ID +
+LENGTH_DESTINATION_ROUTER_ID + LENGTH_COMMAND)
+# A legacy header starts with the ASCII bits of the version number, a binary
+# header starts with the command, which is never 0x30 or 0x31.
+LEGACY_FIRST_BYTES = (ord("0"), ord("1"))
+MIN_ROUTER_ID = 1
+MAX_ROUTER_ID = 64000
+MAX_METRIC = 16
+class RIPPacket:
+    """
+    A validated and decoded rip packet.
+    - Fields
+    1: version,int
+    2: source_router_id,int
+    3: destination_router_id,int
+    4: command,int
+    5: routing_table,dict: {dst: (cst, nexthop)}
+    6: raw, the received buffer, kept so that the packet can be forwarded
+    without being packed again
+    """
+    __slots__ = ("version", "source_router_id", "destination_router_id",
+    "command", "routing_table", "raw")
+    def __init__(self, version, source_router_id, destination_router_id,
+    command, routing_table, raw):
+        self.version = version
+        self.source_router_id = source_router_id
+        self.destination_router_id = destination_router_id
+        self.command = command
+        self.routing_table = routing_table
+        self.raw = raw
+
+def pack_header(source_router_id, destination_router_id, command):
+    """
+    Pack the binary header of a rip packet and return a byte
+    :param source_router_id:
+    :param destination_router_id:
+    :param command:
+    :return: header
+    """
+    return HEADER_FORMAT.pack(command, RIP_VERSION, source_router_id,
+    destination_router_id)
+
+def pack_packets(source_router_id, destination_router_id, command, routes):
+    """
+    Pack routes into as many binary rip packets as needed and return a list of
+    bytes. One packet is always returned, even for an empty routing table.
+    :param source_router_id:
+    :param destination_router_id:
+    :param command:
+    :param routes: list of (dst, cost, next_hop)
+    :return: packets
+    """
+    header = pack_header(source_router_id, destination_router_id, command)
+    packets = []
+    for start in range(0, max(len(routes), 1), MAX_ROUTE_ENTRIES):
+        packet = bytearray(header)
+        for dst, cost, next_hop in routes[start : start + MAX_ROUTE_ENTRIES]:
+            packet += ROUTE_ENTRY_FORMAT.pack(ADDRESS_FAMILY_ROUTER_ID, dst,
+            next_hop, cost)
+        packets.append(bytes(packet))
+    return packets
+
+def valid_header(version, source_router_id, destination_router_id, command,
+commands):
+    """
+    Check the header fields of a rip packet
+    :param version:
+    :param source_router_id:
+    :param destination_router_id:
+    :param command:
+    :param commands: accepted command values
+    :return: bool
+    """
+    return (version == RIP_VERSION and
+    MIN_ROUTER_ID <= source_router_id <= MAX_ROUTER_ID and
+    MIN_ROUTER_ID <= destination_router_id <= MAX_ROUTER_ID and
+    command in commands)
+
+def valid_route(dst, cost, next_hop):
+    """
+    Check the fields of a route entry
+    :param dst:
+    :param cost:
+    :param next_hop:
+    :return: bool
+    """
+    return (type(dst) is int and type(cost) is int and type(next_hop) is int
+    and MIN_ROUTER_ID <= dst <= MAX_ROUTER_ID and
+    MIN_ROUTER_ID <= next_hop <= MAX_ROUTER_ID and 0 <= cost <= MAX_METRIC)
+
+def parse_packet(buffer, commands):
+    """
+    Validate and decode a rip packet in a single pass and return a RIPPacket,
+    or None if the packet is invalid. Binary packets are decoded straight from
+    a memoryview of the buffer without copying it.
+    :param buffer: bytes, bytearray or memoryview of the received datagram
+    :param commands: accepted command values
+    :return: RIPPacket or None
+    """
+    packet = memoryview(buffer)
+    if is_legacy_packet(packet):
+        return parse_legacy_packet(packet, commands)
+    if(len(packet) < HEADER_FORMAT.size or (len(packet) - HEADER_FORMAT.size) %
+    ROUTE_ENTRY_FORMAT.size != 0):
+        return None
+    command, version, source_router_id, destination_router_id = \
+    HEADER_FORMAT.unpack_from(packet)
+    if not valid_header(version, source_router_id, destination_router_id,
+    command, commands):
+        return None
+    routing_table = {}
+    for _, dst, next_hop, cost in ROUTE_ENTRY_FORMAT.iter_unpack(
+    packet[HEADER_FORMAT.size:]):
+        if not valid_route(dst, cost, next_hop):
+            return None
+        routing_table[dst] = (cost, next_hop)
+    return RIPPacket(version, source_router_id, destination_router_id, command,
+    routing_table, packet)
+
+def peek_destination(buffer, commands):
+    """
+    Validate only the header of a rip packet and return its destination router
+    id, so that a packet for another router is forwarded without decoding its
+    route entries.
+    :param buffer: bytes, bytearray or memoryview of the received datagram
+    :param commands: accepted command values
+    :return: destination router id, None if the header is invalid
+    """
+    packet = memoryview(buffer)
+    if is_legacy_packet(packet):
+        header = unpack_legacy_header(packet)
+        if header is None:
+            return None
+        version, source_router_id, destination_router_id, command = header
+    else:
+        if(len(packet) < HEADER_FORMAT.size or (len(packet) -
+        HEADER_FORMAT.size) % ROUTE_ENTRY_FORMAT.size != 0):
+            return None
+        command, version, source_router_id, destination_router_id = \
+        HEADER_FORMAT.unpack_from(packet)
+    if not valid_header(version, source_router_id, destination_router_id,
+    command, commands):
+        return None
+    return destination_router_id
+
+def is_legacy_packet(packet):
+    """
+    Check if the packet is written in the legacy ASCII format
+    :param packet:
+    :return: bool
+    """
+    return len(packet) > 0 and packet[0] in LEGACY_FIRST_BYTES
+
+def pack_legacy_header(source_router_id, destination_router_id, command):
+    """
+    Pack the legacy bitstring header of a rip packet and return a byte
+    :param source_router_id:
+    :param destination_router_id:
+    :param command:
+    :return: header
+    """
+    encoded_version_id = bin(RIP_VERSION).replace('0b',
+    '').zfill(LENGTH_VERSION_NUM)
+    encoded_source_router_id = bin(source_router_id).replace('0b',
+    '').zfill(LENGTH_SOURCE_ROUTER_ID)
+    encoded_destination_router_id = bin(destination_router_id).replace('0b',
+    '').zfill(LENGTH_DESTINATION_ROUTER_ID)
+    encoded_command = bin(command).replace('0b', '').zfill(LENGTH_COMMAND)
+    return (encoded_version_id + encoded_source_router_id +
+    encoded_destination_router_id + encoded_command).encode()
+
+def pack_legacy_packets(source_router_id, destination_router_id, command,
+routing_table):
+    """
+    Pack a routing table into one legacy rip packet and return a list of bytes
+    :param source_router_id:
+    :param destination_router_id:
+    :param command:
+    :param routing_table: {dst: (cst, nexthop, g_timeout, d_timeout)}
+    :return: packets
+    """
+    return [pack_legacy_header(source_router_id, destination_router_id,
+    command) + str(routing_table).encode()]
+
+def unpack_legacy_header(packet):
+    """
+    Unpack the legacy bitstring header of a rip packet
+    :param packet: memoryview of the received datagram
+    :return: (version, source_router_id, destination_router_id, command), None
+    if the header is not a bitstring
+    """
+    try:
+        header = str(packet[:LENGTH_LEGACY_HEADER], "ascii")
+        return (int(header[ : 4], 2), int(header[4 : 20], 2),
+        int(header[20 : 36], 2), int(header[36 : 40], 2))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def parse_legacy_packet(packet, commands):
+    """
+    Validate and decode a legacy rip packet, the packet is decoded and
+    evaluated only once. The routing table is returned in the binary format's
+    form {dst: (cst, nexthop)}.
+    :param packet: memoryview of the received datagram
+    :param commands: accepted command values
+    :return: RIPPacket or None
+    """
+    header = unpack_legacy_header(packet)
+    if header is None:
+        return None
+    version, source_router_id, destination_router_id, command = header
+    if not valid_header(version, source_router_id, destination_router_id,
+    command, commands):
+        return None
+    try:
+        advertised_routing_table = ast.literal_eval(str(
+        packet[LENGTH_LEGACY_HEADER:], "utf-8"))
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+    if not isinstance(advertised_routing_table, dict):
+        return None
+    # Only the cost and the next hop of each route are kept
+    routing_table = {}
+    for dst, route_info in advertised_routing_table.items():
+        if not isinstance(route_info, (tuple, list)) or len(route_info) < 2:
+            return None
+        if not valid_route(dst, route_info[0], route_info[1]):
+            return None
+        routing_table[dst] = (route_info[0], route_info[1])
+    return RIPPacket(version, source_router_id, destination_router_id, command,
+    routing_table, packet)
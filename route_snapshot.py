@@ -0,0 +1,162 @@
+"""
+This module describe the routing table snapshot of one router.
+The snapshot is a file of fixed size records mapped into memory, so a route
+change is written by packing one record in place and the operating system
+writes the page back to the file. It survives a restart of the router process.
+- Layout
+1: header, HEADER_FORMAT.size bytes: magic, format version, router id, number
+of record slots
+2: records, RECORD_FORMAT.size bytes each: destination router id, next hop
+router id, cost, flags. A record is in use when flags has FLAG_IN_USE set.
+The file starts with INITIAL_CAPACITY record slots and doubles when every slot
+is in use. The record of a deleted route is cleared and reused by the next new
+destination. A file written by another router or damaged is overwritten with a
+warning.
+"""
+import logging
+import mmap
+import os
+import struct
+SNAPSHOT_MAGIC = b"RIPS"
+SNAPSHOT_VERSION = 1
+HEADER_FORMAT = struct.Struct("!4sHHI")
+RECORD_FORMAT = struct.Struct("!HHHH")
+INITIAL_CAPACITY = 64
+FLAG_IN_USE = 1
+class RouteSnapshot:
+    """
+    - Basic fields
+    1: file_name,str
+    2: router_id,int, a snapshot written by another router is discarded
+    3: slots,dict: {dst: record index}
+    4: free_slots,list, indexes of the records not in use
+    5: capacity,int, number of record slots in the file
+    6: map,mmap, the whole file mapped into memory, None until open()
+    7: logger,logging.Logger
+    """
+    def __init__(self, file_name, router_id, logger=None):
+        self.file_name = file_name
+        self.router_id = router_id
+        self.logger = logger if logger is not None else logging.getLogger(
+        "rip.snapshot")
+        self.slots = {}
+        self.free_slots = []
+        self.capacity = 0
+        self.fd = None
+        self.map = None
+    def open(self):
+        """
+        Open or create the snapshot file and read the routes it holds
+        :return: list of (dst, cost, next_hop), empty if the file is new, was
+        written by another router or is damaged
+        """
+        self.fd = os.open(self.file_name, os.O_RDWR | os.O_CREAT, 0o644)
+        routes = self.read_routes()
+        if routes is None:
+            routes = []
+            self.slots = {}
+            self.reset(INITIAL_CAPACITY)
+        return routes
+    def read_routes(self):
+        """
+        :return: list of (dst, cost, next_hop), None if the file can not be used
+        """
+        size = os.fstat(self.fd).st_size
+        if size == 0:
+            return None
+        if size < HEADER_FORMAT.size:
+            self.logger.warning("Snapshot %s is damaged, overwriting it",
+            self.file_name)
+            return None
+        self.map = mmap.mmap(self.fd, size)
+        magic, version, router_id, capacity = HEADER_FORMAT.unpack_from(self.map)
+        if(magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or capacity == 0
+        or size != HEADER_FORMAT.size + capacity * RECORD_FORMAT.size):
+            self.logger.warning("Snapshot %s is damaged, overwriting it",
+            self.file_name)
+            return None
+        if router_id != self.router_id:
+            self.logger.warning("Snapshot %s was written by router %d, "
+            "overwriting it", self.file_name, router_id)
+            return None
+        self.capacity = capacity
+        routes = []
+        # The view is released before the map can be closed or grown
+        with memoryview(self.map) as view:
+            for index, (dst, next_hop, cost, flags) in enumerate(
+            RECORD_FORMAT.iter_unpack(view[HEADER_FORMAT.size:])):
+                if flags & FLAG_IN_USE and dst not in self.slots:
+                    self.slots[dst] = index
+                    routes.append((dst, cost, next_hop))
+                else:
+                    self.free_slots.append(index)
+        # Lowest free index is used first
+        self.free_slots.reverse()
+        return routes
+    def reset(self, capacity):
+        """
+        Rewrite the file empty with capacity record slots
+        :param capacity:
+        """
+        if self.map is not None:
+            self.map.close()
+        os.ftruncate(self.fd, 0)
+        os.ftruncate(self.fd, HEADER_FORMAT.size + capacity * RECORD_FORMAT.size)
+        self.map = mmap.mmap(self.fd, HEADER_FORMAT.size + capacity *
+        RECORD_FORMAT.size)
+        HEADER_FORMAT.pack_into(self.map, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+        self.router_id, capacity)
+        self.capacity = capacity
+        self.free_slots = list(range(capacity - 1, -1, -1))
+    def grow(self):
+        """
+        Double the number of record slots, the records in use keep their index
+        """
+        capacity = self.capacity * 2
+        self.map.flush()
+        self.map.close()
+        os.ftruncate(self.fd, HEADER_FORMAT.size + capacity * RECORD_FORMAT.size)
+        self.map = mmap.mmap(self.fd, HEADER_FORMAT.size + capacity *
+        RECORD_FORMAT.size)
+        HEADER_FORMAT.pack_into(self.map, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+        self.router_id, capacity)
+        self.free_slots = list(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+    def write(self, dst, cost, next_hop):
+        """
+        Write the route to dst into its record, taking a free one for a new
+        destination
+        :param dst:
+        :param cost:
+        :param next_hop:
+        """
+        index = self.slots.get(dst)
+        if index is None:
+            if not self.free_slots:
+                self.grow()
+            index = self.free_slots.pop()
+            self.slots[dst] = index
+        RECORD_FORMAT.pack_into(self.map, HEADER_FORMAT.size + index *
+        RECORD_FORMAT.size, dst, next_hop, cost, FLAG_IN_USE)
+    def delete(self, dst):
+        """
+        Mark the record of dst as not in use
+        :param dst:
+        """
+        index = self.slots.pop(dst, None)
+        if index is None:
+            return
+        RECORD_FORMAT.pack_into(self.map, HEADER_FORMAT.size + index *
+        RECORD_FORMAT.size, 0, 0, 0, 0)
+        self.free_slots.append(index)
+    def close(self):
+        """
+        Write the mapped pages back and close the file
+        """
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
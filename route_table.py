@@ -0,0 +1,120 @@
+"""
+This module describe the routing table of one router.
+- Route, one entry of the routing table, its fields are updated in place
+1: cost,int
+2: next_hop,int
+3: g_timeout, absolute time at which the route times out, None if not running
+4: d_timeout, absolute time at which the route is garbage collected, None if
+not running
+- RouteTable
+1: routes,dict: {dst: Route}
+2: version,int, increased by record_change whenever a route changes
+3: changes,OrderedDict: {dst: version}, the version at which each destination
+last changed, oldest change first
+"""
+import sys
+from collections import OrderedDict
+class Route:
+    __slots__ = ("cost", "next_hop", "g_timeout", "d_timeout")
+    def __init__(self, cost, next_hop, g_timeout=None, d_timeout=None):
+        self.cost = cost
+        self.next_hop = next_hop
+        self.g_timeout = g_timeout
+        self.d_timeout = d_timeout
+    def __repr__(self):
+        return "Route({0!r}, {1!r}, {2!r}, {3!r})".format(self.cost,
+        self.next_hop, self.g_timeout, self.d_timeout)
+class RouteTable:
+    def __init__(self):
+        self.routes = {}
+        self.version = 0
+        self.changes = OrderedDict()
+    def __len__(self):
+        return len(self.routes)
+    def __contains__(self, dst):
+        return dst in self.routes
+    def __iter__(self):
+        return iter(self.routes)
+    def __getitem__(self, dst):
+        return self.routes[dst]
+    def get(self, dst):
+        """
+        :param dst:
+        :return: Route, None if there is no route to dst
+        """
+        return self.routes.get(dst)
+    def keys(self):
+        return self.routes.keys()
+    def items(self):
+        return self.routes.items()
+    def set(self, dst, cost, next_hop, g_timeout=None, d_timeout=None):
+        """
+        Set the fields of the route to dst, the route is created if needed and
+        updated in place otherwise
+        :param dst:
+        :param cost:
+        :param next_hop:
+        :param g_timeout:
+        :param d_timeout:
+        :return: Route
+        """
+        route = self.routes.get(dst)
+        if route is None:
+            route = Route(cost, next_hop, g_timeout, d_timeout)
+            self.routes[dst] = route
+        else:
+            route.cost = cost
+            route.next_hop = next_hop
+            route.g_timeout = g_timeout
+            route.d_timeout = d_timeout
+        return route
+    def pop(self, dst):
+        """
+        Remove the route to dst
+        :param dst:
+        :return: Route
+        """
+        return self.routes.pop(dst)
+    def record_change(self, dst):
+        """
+        Record in the change journal that the route to dst changed
+        :param dst:
+        """
+        self.version += 1
+        self.changes[dst] = self.version
+        self.changes.move_to_end(dst)
+    def changed_since(self, since_version):
+        """
+        :param since_version:
+        :return: list of the destinations changed after since_version
+        """
+        destinations = []
+        for dst, version in reversed(self.changes.items()):
+            if version <= since_version:
+                break
+            destinations.append(dst)
+        return destinations
+    def prune_changes(self, oldest_version):
+        """
+        Forget the changes made up to oldest_version
+        :param oldest_version:
+        """
+        while self.changes:
+            dst, version = next(iter(self.changes.items()))
+            if version > oldest_version:
+                break
+            self.changes.popitem(last=False)
+    def memory_footprint(self):
+        """
+        Approximate memory used by the table in bytes, counting the dictionaries,
+        the route entries and the deadlines they hold
+        :return: int
+        """
+        size = sys.getsizeof(self.routes) + sys.getsizeof(self.changes)
+        for dst, route in self.routes.items():
+            size += sys.getsizeof(dst) + sys.getsizeof(route)
+            if route.g_timeout is not None:
+                size += sys.getsizeof(route.g_timeout)
+            if route.d_timeout is not None:
+                size += sys.getsizeof(route.d_timeout)
+        return size
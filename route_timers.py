@@ -0,0 +1,62 @@
+"""
+This module describe the deadline index used for route timeout and garbage
+collection.
+- Basic fields
+1: deadlines, dict: {dst: deadline}, the one pending deadline of each route
+2: heap, list, min-heap of (deadline, dst)
+Setting a new deadline for a route only pushes a new heap entry. Entries which
+no longer match deadlines[dst] are stale and skipped when they reach the top,
+and the heap is rebuilt once stale entries outnumber the live ones.
+"""
+import heapq
+COMPACT_MIN_SIZE = 64
+class DeadlineHeap:
+    def __init__(self):
+        self.deadlines = {}
+        self.heap = []
+    def __len__(self):
+        return len(self.deadlines)
+    def set(self, dst, deadline):
+        """
+        Set or reset the deadline of dst
+        :param dst:
+        :param deadline:
+        """
+        self.deadlines[dst] = deadline
+        heapq.heappush(self.heap, (deadline, dst))
+        if len(self.heap) > COMPACT_MIN_SIZE and len(self.heap) > 2 * len(self.deadlines):
+            self.compact()
+    def compact(self):
+        """
+        Rebuild the heap from the live deadlines only
+        """
+        self.heap = [(deadline, dst) for dst, deadline in self.deadlines.items()]
+        heapq.heapify(self.heap)
+    def drop_stale(self):
+        """
+        Pop stale entries from the top of the heap
+        """
+        while self.heap and self.deadlines.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+    def next_deadline(self):
+        """
+        :return: earliest pending deadline, None if there is none
+        """
+        self.drop_stale()
+        if not self.heap:
+            return None
+        return self.heap[0][0]
+    def pop_due(self, now):
+        """
+        Remove and return every destination whose deadline is not after now
+        :param now:
+        :return: list of dst
+        """
+        due = []
+        self.drop_stale()
+        while self.heap and self.heap[0][0] <= now:
+            _, dst = heapq.heappop(self.heap)
+            del self.deadlines[dst]
+            due.append(dst)
+            self.drop_stale()
+        return due
@@ -6,26 +6,72 @@ This module describe one router,it contains router basic fields and functions.
 on which the instance of the routing demon will listen for incoming routing
 packets from peer routing demons. There needs to be a separate input port for
 each neighbor the router has
-3: output_ports,dict: {dst,(cst, port)}, specify the contact information for
-neighboured routers about cost and port.
-4: address, 127.0.0.1
-5: routing_table,dict: {dst: (cst, nexthop, g_timeout,d_timeout)}, specify the
-routing table,g_timeout for timeout,
-and d_timeout for garbage collection.
-6: sockets, dict: {port: socket}, specify the socket and the binded port.
-7: sender,socket, do the sending work
+3: output_ports,dict: {dst,(cst, port)}, specify the "contact information" for
+neighboured routers about cost and port. apply_config changes the input ports
+and output_ports of a running router.
+4: transport, UDPTransport by default (UDP sockets on 127.0.0.1) or a
+MemoryTransport when several routers are simulated in one process. It delivers
+received datagrams to receive_datagram and sends packets to neighbour ports.
+5: routing_table,RouteTable: {dst: Route(cst, nexthop, g_timeout,d_timeout)},
+specify the routing table,g_timeout is the absolute time at which the route
+times out and d_timeout the absolute time at which it is garbage collected, None
+if the timer is not running. Routes are updated in place.
+6: legacy_format,bool, send packets in the old ASCII format, packets in both
+formats are always accepted
+7: scheduler,Scheduler, the event loop which owns the transport, the periodic
+update and the route timers. Everything runs on the thread calling
+switch_on_router, so the routing table needs no lock.
+8: route_deadlines,DeadlineHeap, the pending timeout or garbage collection
+deadline of every route, so a timer wakeup only touches the routes which are due
+9: triggered_update_delay,tuple: (min, max), after a triggered update is sent
+further triggered updates are held off for a random time in this range and
+merged into one update per neighbour. triggered_updates_sent and
+triggered_updates_suppressed count the updates sent and merged away,
+periodic_updates_sent the periodic updates.
+On start the router sends a request to every neighbour, which answers at once
+with its whole split-horizon table, without waiting for the holdoff or its
+periodic update. requests_sent and requests_answered count them.
+10: routing_table.version is increased whenever the cost or next hop of a
+route changes or a route is deleted, and routing_table.changes journals the
+version at which each destination last changed.
+advertised_versions,dict: {neighbour: version}, the routing table version last
+advertised to each neighbour. Triggered updates only carry the destinations
+which changed since then, periodic updates carry the whole table.
+11: advertisement_cache,dict: {neighbour: [packet]}, the encoded periodic
+update of each neighbour. An entry is dropped only when a route change alters
+what that neighbour is advertised.
+last_route_change, loop time of the last cost or next hop change, None before
+the first one.
+12: logger, logging.Logger "rip.router.<router_id>". Routing table dumps are
+logged at DEBUG level, at most once per table_dump_interval seconds each for
+this router's table and for received tables.
+13: metrics,RouterMetrics, packets received, sent and dropped per port,
+validation failures, and the time spent in calculate_routing_table,
+advertise_routing_table and timer_for_router. The snapshot is logged every
+stats_interval seconds if it is set, and served by metrics.StatsServer.
+14: snapshot,RouteSnapshot, the routes written to snapshot_file as they
+change, None without a snapshot file. On start the routes of the snapshot are
+installed as stale routes, so forwarding resumes at once after a restart.
+stale_routes,set, the restored destinations not yet confirmed. They time out
+STALE_ROUTE_TIMEOUT seconds after the restart and are not advertised, unless
+an update from a neighbour refreshes or replaces them first.
+15: fib,dict: {dst: port}, the forwarding table, the input port of the next hop
+of every reachable destination other than this router. It is updated only when
+the cost or next hop of a route changes, and packets for other routers are
+forwarded from it after reading nothing but their header.
 """
-import socket
-from threading import Timer
-import select
-import ast
 import random
-import datetime
-RIP_VERSION = 2
-LENGTH_VERSION_NUM = 4
-LENGTH_SOURCE_ROUTER_ID = 16
-LENGTH_DESTINATION_ROUTER_ID = 16
-LENGTH_COMMAND = 4
+import logging
+import time
+import json
+import rip_packet
+from scheduler import Scheduler
+from route_timers import DeadlineHeap
+from route_table import RouteTable, Route
+from rip_logging import RateLimiter, RoutingTableDump, TABLE_DUMP_INTERVAL
+from metrics import RouterMetrics
+from route_snapshot import RouteSnapshot
+from transport import UDPTransport
 INDEX_OF_LINK_COST = 0
 INDEX_OF_NEXT_HOP = 1
 INDEX_OF_G_TIMEOUT = 2
@@ -33,320 +79,610 @@ INDEX_OF_D_TIMEOUT = 3
 GARBAGE_TIMEOUT = 60
 DELETE_TIMEOUT = 40
 TIMER_VALUE_FOR_PERIOD_UPDATE = 10
+# Long enough for the next hop to answer the request or send a periodic update
+STALE_ROUTE_TIMEOUT = 2 * TIMER_VALUE_FOR_PERIOD_UPDATE
+TRIGGERED_UPDATE_MIN_DELAY = 1
+TRIGGERED_UPDATE_MAX_DELAY = 5
 MAX_LINK_COST = 16
-TIMER_VALUE_FOR_TIME_OUT = 1
 COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE = 1
+COMMAND_VALUE_FOR_REQUEST_ROUTING_TABLE = 2
+VALID_COMMANDS = (COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE,
+COMMAND_VALUE_FOR_REQUEST_ROUTING_TABLE)
 class Router:
-    def __init__(self, router_id, input_ports, output_ports):
+    def __init__(self, router_id, input_ports, output_ports, legacy_format=False,
+    scheduler=None, triggered_update_delay=(TRIGGERED_UPDATE_MIN_DELAY,
+    TRIGGERED_UPDATE_MAX_DELAY), table_dump_interval=TABLE_DUMP_INTERVAL,
+    transport=None, stats_interval=None, snapshot_file=None):
         """
         :param router_id:
         :param input_ports:
         :param output_ports:
+        :param legacy_format: send the old ASCII packet format
+        :param scheduler: event loop shared with other routers, a new one is
+        created if it is None
+        :param triggered_update_delay: (min, max) seconds of triggered update
+        holdoff
+        :param table_dump_interval: minimum seconds between two routing table
+        dumps at DEBUG level
+        :param transport: UDPTransport if it is None
+        :param stats_interval: seconds between two metrics snapshots logged at
+        INFO level, None to never log them
+        :param snapshot_file: file the routing table is saved to and restored
+        from on start, None to start with an empty routing table
         """
         self.router_id = router_id
+        self.legacy_format = legacy_format
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.periodic_update_timer = None
+        self.timeout_timer = None
+        self.route_deadlines = DeadlineHeap()
+        self.triggered_update_delay = triggered_update_delay
+        self.triggered_update_timer = None
+        self.triggered_update_holdoff_until = 0
+        self.triggered_updates_sent = 0
+        self.triggered_updates_suppressed = 0
+        self.periodic_updates_sent = 0
+        self.requests_sent = 0
+        self.requests_answered = 0
+        self.metrics = RouterMetrics()
+        self.stats_interval = stats_interval
+        self.stats_timer = None
+        self.snapshot_file = snapshot_file
+        self.snapshot = None
+        self.stale_routes = set()
+        self.fib = {}
+        self.advertised_versions = {}
+        self.advertisement_cache = {}
+        self.last_route_change = None
+        self.logger = logging.getLogger("rip.router.{0:d}".format(router_id))
+        self.table_dump_limiter = RateLimiter(table_dump_interval,
+        self.scheduler.time)
+        self.received_table_dump_limiter = RateLimiter(table_dump_interval,
+        self.scheduler.time)
         self.input_ports = input_ports
         self.output_ports = output_ports
-        self.address = "127.0.0.1"
-        self.routing_table = {}
-        self.sockets = {}
-        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        for port in self.input_ports:
-            # Creates as many UDP sockets as it has input ports and binds one socket
-            # to each port.
-            self.sockets[port] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sockets[port].bind((self.address, port))
+        self.routing_table = RouteTable()
+        self.transport = transport if transport is not None else UDPTransport()
     def initialise_routing_table(self):
         """
         initialise routing table
         """
-        self.routing_table[self.router_id] = (0, self.router_id, 0, 0)
-    def pack_routing_table(self, sending_routing_table):
+        self.routing_table.set(self.router_id, 0, self.router_id)
+    def pack_RIP_packets(self, dst_router, command, routing_table):
         """
-        Pack routing table and return a byte
-        :param sending_routing_table:
-        :return: encoded_routing_table
+        Pack a routing table into rip packets and return a list of bytes.
+        The legacy ASCII format is used if the router runs in compatibility mode,
+        otherwise the routing table is split into binary packets.
+        :param dst_router:
+        :param command:
+        :param routing_table:
+        :return: packets
         """
-        encoded_routing_table = str(sending_routing_table).encode()
-        return encoded_routing_table
-    def unpack_routing_table(self, packet):
+        if self.legacy_format:
+            # Old routers expect the elapsed timer values, not deadlines
+            legacy_routing_table = {}
+            for dst, route_info in routing_table.items():
+                legacy_routing_table[dst] = (route_info[INDEX_OF_LINK_COST],
+                route_info[INDEX_OF_NEXT_HOP]) + self.route_timer_values(
+                route_info[INDEX_OF_G_TIMEOUT], route_info[INDEX_OF_D_TIMEOUT])
+            return rip_packet.pack_legacy_packets(self.router_id, dst_router,
+            command, legacy_routing_table)
+        routes = [(dst, route_info[INDEX_OF_LINK_COST],
+        route_info[INDEX_OF_NEXT_HOP]) for dst, route_info in routing_table.items()]
+        return rip_packet.pack_packets(self.router_id, dst_router, command, routes)
+    def update_route(self, dst, cost, next_hop):
         """
-        Unpack routing table and return a dictionary routing table
-        :param packet:
-        :return: decoded_routing_table
+        Install or refresh a route and reset its deadline.
+        A reachable route times out GARBAGE_TIMEOUT seconds after its last
+        refresh. A route with cost 16 is garbage collected DELETE_TIMEOUT seconds
+        after it became unreachable, refreshing it with cost 16 again does not
+        restart the garbage collection timer.
+        :param dst:
+        :param cost:
+        :param next_hop:
+        """
+        now = self.scheduler.time()
+        route = self.routing_table.get(dst)
+        if cost > MAX_LINK_COST:
+            cost = MAX_LINK_COST
+        # A stale route is advertised once it is refreshed or replaced
+        confirmed = dst in self.stale_routes
+        if confirmed:
+            self.stale_routes.discard(dst)
+            self.advertisement_cache.clear()
+        if(confirmed or route is None or route.cost != cost or route.next_hop !=
+        next_hop):
+            self.record_route_change(dst, route, cost, next_hop)
+        if route is None:
+            route = self.routing_table.set(dst, cost, next_hop)
+        else:
+            route.cost = cost
+            route.next_hop = next_hop
+        if cost == MAX_LINK_COST:
+            route.g_timeout = None
+            if route.d_timeout is None:
+                route.d_timeout = now + DELETE_TIMEOUT
+                self.set_route_deadline(dst, route.d_timeout)
+        else:
+            route.g_timeout = now + GARBAGE_TIMEOUT
+            route.d_timeout = None
+            self.set_route_deadline(dst, route.g_timeout)
+    def record_route_change(self, dst, route, cost, next_hop):
         """
-        temp = packet[40:].decode()
-        decoded_routing_table = ast.literal_eval(temp)
-        return decoded_routing_table
-    def pack_common_RIP_packet(self, dst_router, command):
+        Record in the change journal that the route to dst changed and drop the
+        cached advertisements which the change alters. Called before the route
+        is updated.
+        :param dst:
+        :param route: Route before the change, None if the route is new
+        :param cost: new cost, None if the route is deleted
+        :param next_hop: new next hop
         """
-        Pack common information of a rip packet and return a byte
-        :param dst_router:
-        :param command:
-        :return: common_RIP_packet
-        """
-        encoded_version_id = bin(RIP_VERSION).replace('0b',
-        '').zfill(LENGTH_VERSION_NUM)
-        encoded_source_router_id = bin(self.router_id).replace('0b',
-        '').zfill(LENGTH_SOURCE_ROUTER_ID)
-        encoded_destination_router_id = bin(dst_router).replace('0b',
-        '').zfill(LENGTH_DESTINATION_ROUTER_ID)
-        encoded_command = bin(command).replace('0b', '').zfill(LENGTH_COMMAND)
-        common_RIP_packet = (encoded_version_id + encoded_source_router_id +
-        encoded_destination_router_id + encoded_command).encode()
-        return common_RIP_packet
-    def unpack_common_RIP_packet(self, packet):
-        """
-        Unack common rip packet and return a tuble
-        :param packet:
-        :return: decoded_common_RIP_packet
-        """
-        decoded_pack = packet.decode()
-        version = int(decoded_pack[ : 4], 2)
-        source_router_id = int(decoded_pack[4 : 20], 2)
-        destination_router_id = int(decoded_pack[20 : 36], 2)
-        command = int(decoded_pack[36 : 40], 2)
-        decoded_common_rip_packet = (source_router_id, destination_router_id, command)
-        return decoded_common_rip_packet
+        self.routing_table.record_change(dst)
+        if cost is not None:
+            self.last_route_change = self.scheduler.time()
+        if route is None:
+            old_cost = old_next_hop = None
+        else:
+            old_cost = route.cost
+            old_next_hop = route.next_hop
+        for router in list(self.advertisement_cache.keys()):
+            if(self.advertised_route(router, dst, old_cost, old_next_hop) !=
+            self.advertised_route(router, dst, cost, next_hop)):
+                del self.advertisement_cache[router]
+        if self.snapshot is not None:
+            if cost is None:
+                self.snapshot.delete(dst)
+            else:
+                self.snapshot.write(dst, cost, next_hop)
+        self.update_fib(dst, cost, next_hop)
+    def update_fib(self, dst, cost, next_hop):
+        """
+        Point the forwarding table entry of dst at the port of its next hop
+        :param dst:
+        :param cost: None if the route is deleted
+        :param next_hop:
+        """
+        neighbour = self.output_ports.get(next_hop)
+        if(cost is None or cost >= MAX_LINK_COST or neighbour is None or dst ==
+        self.router_id):
+            self.fib.pop(dst, None)
+        else:
+            self.fib[dst] = neighbour[INDEX_OF_NEXT_HOP]
+    def rebuild_fib(self):
+        """
+        Rebuild the whole forwarding table from the routing table
+        """
+        self.fib = {}
+        for dst, route in self.routing_table.items():
+            self.update_fib(dst, route.cost, route.next_hop)
+    def restore_snapshot(self):
+        """
+        Open the snapshot file and install the routes it holds as stale routes,
+        except the routes through a router which is no longer a neighbour
+        """
+        snapshot = RouteSnapshot(self.snapshot_file, self.router_id, self.logger)
+        try:
+            routes = snapshot.open()
+        except (OSError, ValueError) as error:
+            self.logger.warning("Can not use snapshot %s: %s", self.snapshot_file,
+            error)
+            snapshot.close()
+            return
+        self.snapshot = snapshot
+        restored = 0
+        for dst, cost, next_hop in routes:
+            if dst == self.router_id or next_hop not in self.output_ports:
+                snapshot.delete(dst)
+            else:
+                self.update_route(dst, cost, next_hop)
+                route = self.routing_table[dst]
+                if route.g_timeout is not None:
+                    route.g_timeout = self.scheduler.time() + STALE_ROUTE_TIMEOUT
+                    self.set_route_deadline(dst, route.g_timeout)
+                    self.stale_routes.add(dst)
+                restored += 1
+        self.logger.info("Restored %d routes from %s", restored,
+        self.snapshot_file)
+    def prune_route_changes(self):
+        """
+        Forget the changes which every neighbour has already been advertised
+        """
+        if len(self.advertised_versions) < len(self.output_ports):
+            return
+        self.routing_table.prune_changes(min(self.advertised_versions.values()))
+    def set_route_deadline(self, dst, deadline):
+        """
+        Reset the deadline of a route and wake the timer earlier if needed
+        :param dst:
+        :param deadline:
+        """
+        self.route_deadlines.set(dst, deadline)
+        if self.timeout_timer is None or deadline < self.timeout_timer.when:
+            self.schedule_route_timer()
+    def schedule_route_timer(self):
+        """
+        Schedule timer_for_router at the earliest route deadline. Exactly one
+        timeout timer is pending while any route has a deadline.
+        """
+        if self.timeout_timer is not None:
+            self.timeout_timer.cancel()
+            self.timeout_timer = None
+        next_deadline = self.route_deadlines.next_deadline()
+        if next_deadline is not None:
+            self.timeout_timer = self.scheduler.call_at(next_deadline,
+            self.timer_for_router)
+    def route_timer_values(self, g_timeout, d_timeout):
+        """
+        Seconds elapsed on the timeout and garbage collection timers of a route,
+        as shown in the routing table.
+        :param g_timeout: timeout deadline
+        :param d_timeout: garbage collection deadline
+        :return: (g_timeout, d_timeout)
+        """
+        now = self.scheduler.time()
+        if d_timeout is not None:
+            return (GARBAGE_TIMEOUT, max(0, int(DELETE_TIMEOUT - (d_timeout - now))))
+        if g_timeout is not None:
+            return (max(0, int(GARBAGE_TIMEOUT - (g_timeout - now))), 0)
+        return (0, 0)
     def timer_for_router(self):
         """
         1.Timer for this router to timeout one route and delete this route.
-        2.The garbage collection time is 180s and the delete time is 120s.
-        3.Change route cost from this router to garbage router to 16 and advertise
-        this router's routing table to neighbours when garbage collection time is
-        180s
-        4.Delete route from this router to garbage router when the delete time is 120
-        and then advertise this router's routing table to neighbours.
+        2.A route times out GARBAGE_TIMEOUT seconds after its last refresh and is
+        deleted DELETE_TIMEOUT seconds after it became unreachable.
+        3.Change route cost from this router to the timed out router to 16 and
+        advertise this router's routing table to neighbours.
+        4.Delete route from this router to garbage router when the garbage
+        collection timer expires and then advertise this router's routing table
+        to neighbours.
+        Only the routes whose deadline has passed are visited.
         :return:
         """
+        started = time.perf_counter()
+        self.timeout_timer = None
         invalid_des = []
-        for des, routeinfo in self.routing_table.items():
-            if self.routing_table[des][INDEX_OF_D_TIMEOUT] == DELETE_TIMEOUT:
+        for des in self.route_deadlines.pop_due(self.scheduler.time()):
+            route = self.routing_table[des]
+            if route.d_timeout is not None:
                 invalid_des.append(des)
-                continue
-            if des != self.router_id:
-                if self.routing_table[des][INDEX_OF_G_TIMEOUT] < GARBAGE_TIMEOUT and \
-                self.routing_table[des][INDEX_OF_LINK_COST] != MAX_LINK_COST:
-                    self.routing_table[des] = (self.routing_table[des][INDEX_OF_LINK_COST],
-                    self.routing_table[des][INDEX_OF_NEXT_HOP],
-                    self.routing_table[des][INDEX_OF_G_TIMEOUT] + 1,
-                    self.routing_table[des][INDEX_OF_D_TIMEOUT])
-                elif self.routing_table[des][INDEX_OF_G_TIMEOUT] == GARBAGE_TIMEOUT:
-                    self.routing_table[des] = (MAX_LINK_COST,self.routing_table[des][INDEX_OF_NEXT_HOP],
-                    GARBAGE_TIMEOUT,self.routing_table[des][INDEX_OF_D_TIMEOUT] + 1)
-                    if self.routing_table[des][INDEX_OF_D_TIMEOUT] == 1:
-                        print("At time: " + str(datetime.datetime.now()) + " "
-                        "Advertise routing table: Can not connect to {0:1d} after ".format(des) + str(GARBAGE_TIMEOUT) + "s.")
-                    self.advertise_routing_table()
-                elif self.routing_table[des][INDEX_OF_LINK_COST] == MAX_LINK_COST and self.routing_table[des][INDEX_OF_G_TIMEOUT] != GARBAGE_TIMEOUT:
-                    self.routing_table[des] = (MAX_LINK_COST,
-                    self.routing_table[des][INDEX_OF_NEXT_HOP],
-                    self.routing_table[des][INDEX_OF_G_TIMEOUT],
-                    self.routing_table[des][INDEX_OF_D_TIMEOUT] + 1)
-                if len(invalid_des) > 0:
-                    for des in invalid_des:
-                        self.routing_table.pop(des)
-                        print("At time: " + str(datetime.datetime.now()) + " " +
-                        "Delete route from {0:1d} to {1:1d}".format(self.router_id,
-                        des))
-                        print("At time: " + str(datetime.datetime.now()) + " " + "Advertise routing table: Delete route")
-                    self.advertise_routing_table()
-                Timer(TIMER_VALUE_FOR_TIME_OUT, self.timer_for_router, args='').start()
-    def advertise_routing_table(self):
+            else:
+                self.update_route(des, MAX_LINK_COST, route.next_hop)
+                self.logger.info("Advertise routing table: Can not connect to %d "
+                "after %ds.", des, GARBAGE_TIMEOUT)
+                self.trigger_update()
+        if len(invalid_des) > 0:
+            for des in invalid_des:
+                self.record_route_change(des, self.routing_table[des], None, None)
+                self.routing_table.pop(des)
+                self.logger.info("Delete route from %d to %d", self.router_id, des)
+                self.logger.info("Advertise routing table: Delete route")
+            self.trigger_update()
+        self.schedule_route_timer()
+        self.metrics.observe("timer_for_router", time.perf_counter() - started)
+    def advertise_routing_table(self, changed_only=False):
         """
         Advertise routing table
+        :param changed_only: only advertise the routes which changed since each
+        neighbour was last advertised to
         """
-        try:
-            print("\n")
-            print("----->Routing table for router " + str(self.router_id))
-            print("Print routing table at time: " + str(datetime.datetime.now()))
-            self.print_routing_table(self.routing_table)
-            print("\n")
-            for router, route in self.output_ports.items(): # router to be advertised
-                advertised_routing_table = {}
+        started = time.perf_counter()
+        self.log_routing_table(self.table_dump_limiter,
+        "----->Routing table for router {0:d} (triggered updates sent: {1:d}, "
+        "suppressed: {2:d})".format(self.router_id, self.triggered_updates_sent,
+        self.triggered_updates_suppressed), self.routing_table)
+        for router, route in self.output_ports.items(): # router to be advertised
+            if changed_only:
+                destinations = self.routing_table.changed_since(
+                self.advertised_versions.get(router, 0))
+                if not destinations:
+                    continue
+                messages = self.pack_RIP_packets(router,
+                COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE,
+                self.build_advertised_routing_table(router, destinations))
+            else:
+                messages = self.full_advertisement(router)
+            for message in messages:
+                self.send_packet(route[INDEX_OF_NEXT_HOP], message)
+            self.advertised_versions[router] = self.routing_table.version
+        self.prune_route_changes()
+        self.metrics.observe("advertise_routing_table", time.perf_counter() -
+        started)
+    def full_advertisement(self, router):
+        """
+        :param router: neighbour to be advertised
+        :return: packets carrying the whole routing table as advertised to this
+        neighbour, from advertisement_cache when possible
+        """
+        messages = self.advertisement_cache.get(router)
+        if messages is None:
+            messages = self.pack_RIP_packets(router,
+            COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE,
+            self.build_advertised_routing_table(router, self.routing_table.keys()))
+            # Legacy packets carry the timers, so they can not be reused
+            if not self.legacy_format:
+                self.advertisement_cache[router] = messages
+        return messages
+    def request_routing_tables(self, routers=None):
+        """
+        Ask neighbours for their whole routing table. A request carries no
+        route entry.
+        :param routers: neighbours to ask, every neighbour if it is None
+        """
+        for router in (self.output_ports if routers is None else routers):
+            for message in self.pack_RIP_packets(router,
+            COMMAND_VALUE_FOR_REQUEST_ROUTING_TABLE, {}):
+                self.send_packet(self.output_ports[router][INDEX_OF_NEXT_HOP],
+                message)
+            self.requests_sent += 1
+    def advertise_to(self, router):
+        """
+        Send the whole split-horizon routing table to one neighbour at once
+        :param router:
+        """
+        port = self.output_ports[router][INDEX_OF_NEXT_HOP]
+        for message in self.full_advertisement(router):
+            self.send_packet(port, message)
+        self.advertised_versions[router] = self.routing_table.version
+    def answer_request(self, sender_router):
+        """
+        Send the whole split-horizon routing table to a neighbour which asked
+        for it, straight away and outside the triggered update holdoff.
+        :param sender_router:
+        :return: bool, False if the sender is not a neighbour
+        """
+        if sender_router not in self.output_ports:
+            return False
+        self.advertise_to(sender_router)
+        self.requests_answered += 1
+        return True
+    def build_advertised_routing_table(self, router, destinations):
+        """
+        Implement split-horizon with poisoned reverse.
+        For any update message or unsolicited response a separate routing
+        table needs to be created for each neighbor.
+        :param router: neighbour to be advertised
+        :param destinations: destinations to be advertised
+        :return: advertised_routing_table
+        """
+        advertised_routing_table = {}
+        for dst in destinations:
+            route = self.routing_table.get(dst)
+            """
+            'route.next_hop == router and dst != router' means that The router
+            learned this route from this neighbours, the router will not
+            advertise this route to neighbours router.
+            'dst == self.router_id' this means that this route is myself,the
+            router will not advertise this route to neighbours router.
+            """
+            if route is None:
+                # The route has been deleted since it was last advertised
+                advertised_routing_table[dst] = (MAX_LINK_COST,
+                self.router_id, None, None)
+            elif (route.next_hop == router and dst != router):
+                """ split horizon:"""
+                advertised_routing_table[dst] = (MAX_LINK_COST, route.next_hop,
+                route.g_timeout, route.d_timeout)
+            elif dst == self.router_id or dst in self.stale_routes:
+                continue
+            else:
                 """
-                Implement split-horizon with poisoned reverse.
-                For any update message or unsolicited response a separate routing
-                table needs to be created for each neighbor.
+                Prepare routing table which can be advertised to destination
+                neighbours.
                 """
-                for dst, route_info in self.routing_table.items():
-                    """
-                    'route_info[1] == router and dst != router' means that The router
-                    learned this route from this neighbours, the router will not
-                    advertise this route to neighbours router.
-                    'dst == self.router_id' this means that this route is myself,the
-                    router will not advertise this route to neighbours router.
-                    """
-                    if (route_info[INDEX_OF_NEXT_HOP] == router and dst != router):
-                        """ split horizon:"""
-                        advertised_routing_table[dst] = (MAX_LINK_COST,
-                        route_info[INDEX_OF_NEXT_HOP],
-                        route_info[INDEX_OF_G_TIMEOUT], route_info[INDEX_OF_D_TIMEOUT])
-                    elif dst == self.router_id:
-                        continue
-                    else:
-                        """
-                        Prepare routing table which can be advertised to destination
-                        neighbours.
-                        """
-                        advertised_routing_table[dst] = route_info
-                        """
-                        If neighbour router are now in the router's routing
-                        table,check its cost to the router.
-                        If cost is 16, it means that this route is invalid now,the
-                        router will not advertise routing table to the neighbour.
-                        """
-                    if router in self.routing_table.keys():
-                        if self.routing_table[router][INDEX_OF_LINK_COST] < MAX_LINK_COST:
-                            message = self.pack_common_RIP_packet(router,
-                            COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE) + \
-                            self.pack_routing_table(advertised_routing_table)
-                            self.sender.sendto(message, (self.address,
-                            self.output_ports[router][INDEX_OF_NEXT_HOP]))
-                        else:
-                            message = self.pack_common_RIP_packet(router,
-                            COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE) + \
-                            self.pack_routing_table(advertised_routing_table)
-                            self.sender.sendto(message, (self.address,
-                            self.output_ports[router][INDEX_OF_NEXT_HOP]))
-            # The time for period is uniform distribution
-            period = random.uniform(0.8 * TIMER_VALUE_FOR_PERIOD_UPDATE, 1.2 *
-            TIMER_VALUE_FOR_PERIOD_UPDATE)
-            Timer(period, self.advertise_routing_table, args='').start()
-        except KeyboardInterrupt:
-            print("Keyboard Interrupt")
+                advertised_routing_table[dst] = (route.cost, route.next_hop,
+                route.g_timeout, route.d_timeout)
+        return advertised_routing_table
+    def advertised_route(self, router, dst, cost, next_hop):
+        """
+        The (cst, nexthop) of a route as advertised to one neighbour, used to
+        check whether a change of the route changes that neighbour's packet.
+        :param router: neighbour
+        :param dst:
+        :param cost: None if the route is deleted
+        :param next_hop:
+        :return: (cst, nexthop)
+        """
+        if cost is None:
+            return (MAX_LINK_COST, self.router_id)
+        if (next_hop == router and dst != router):
+            return (MAX_LINK_COST, next_hop)
+        return (cost, next_hop)
+    def periodic_update(self):
+        """
+        Advertise routing table and schedule the next periodic update. Only this
+        method schedules itself, so there is exactly one periodic update chain
+        however many triggered updates are sent. A pending triggered update is
+        merged into the periodic one.
+        """
+        if self.triggered_update_timer is not None:
+            self.triggered_update_timer.cancel()
+            self.triggered_update_timer = None
+            self.triggered_updates_suppressed += 1
+        self.advertise_routing_table()
+        self.periodic_updates_sent += 1
+        # The time for period is uniform distribution
+        period = random.uniform(0.8 * TIMER_VALUE_FOR_PERIOD_UPDATE, 1.2 *
+        TIMER_VALUE_FOR_PERIOD_UPDATE)
+        self.periodic_update_timer = self.scheduler.call_later(period,
+        self.periodic_update)
+    def trigger_update(self):
+        """
+        Ask for a triggered update. The update is sent once the current event is
+        handled, or when the holdoff after the previous triggered update ends.
+        Requests made while an update is pending are merged into it.
+        """
+        if self.triggered_update_timer is not None:
+            self.triggered_updates_suppressed += 1
+            return
+        when = max(self.scheduler.time(), self.triggered_update_holdoff_until)
+        self.triggered_update_timer = self.scheduler.call_at(when,
+        self.send_triggered_update)
+    def send_triggered_update(self):
+        """
+        Send the pending triggered update and start the holdoff window
+        """
+        self.triggered_update_timer = None
+        self.advertise_routing_table(changed_only=True)
+        self.triggered_updates_sent += 1
+        self.triggered_update_holdoff_until = self.scheduler.time() + \
+        random.uniform(*self.triggered_update_delay)
+    def send_packet(self, port, packet):
+        """
+        Send a packet to the input port of a neighbour and count it
+        :param port:
+        :param packet:
+        """
+        self.metrics.sent_packets[port] += 1
+        self.metrics.sent_bytes[port] += len(packet)
+        self.transport.send(port, packet)
     def send_message_to_destination(self, dst, packet):
         """
-        Ask neighbours router to print routing table
+        Forward a packet towards dst through the forwarding table. Packets for
+        unreachable destinations are counted in metrics.unroutable.
         :param dst:
         :param packet:
+        :return: bool, False if the packet could not be forwarded
         """
-        if dst in self.routing_table.keys():
-            if self.routing_table[dst][INDEX_OF_LINK_COST] < MAX_LINK_COST:
-                hop = self.routing_table[dst][INDEX_OF_NEXT_HOP]
-                port = self.output_ports[hop][INDEX_OF_NEXT_HOP]
-                self.sender.sendto(packet, (self.address, port))
-            else:
-                print("The connect to destination is fail.")
-        else:
-            print("Destination {0:1d} is not turn on now!".format(dst))
+        port = self.fib.get(dst)
+        if port is None:
+            self.metrics.unroutable += 1
+            return False
+        self.metrics.forwarded += 1
+        self.send_packet(port, packet)
+        return True
     def calculate_routing_table(self, sender_router, advertised_routing_table):
         """
         Calculate routing table and advertise new routing table if it has been update.
         :param sender_router:
         :param advertised_routing_table:
         """
-        print("Unsolicited Routing table from {0:1d}".format(sender_router))
-        print("Get Unsolicited routing table at time: " + str(datetime.datetime.now()))
-        self.print_routing_table(advertised_routing_table)
-        # Old routing table, this routing table is used to compare to new this
-        #router's new routing table
-        old_routing_table = self.routing_table
+        started = time.perf_counter()
+        self.log_routing_table(self.received_table_dump_limiter,
+        "Unsolicited Routing table from {0:d}".format(sender_router),
+        advertised_routing_table)
+        # Routing table version before the update, used to check whether any
+        # route changed
+        old_version = self.routing_table.version
         # If advertised routing table is empty, advertise to neighbours.
         if not bool(advertised_routing_table):
             for router, route in self.output_ports.items():
                 if sender_router == router:
-                    self.routing_table[sender_router] = (route[INDEX_OF_LINK_COST],sender_router, 0, 0)
+                    self.update_route(sender_router, route[INDEX_OF_LINK_COST],
+                    sender_router)
                     break
         else:
             """
             If advertised routing table is not empty but the destination is not in
             the router's routing table advertise to neighbours
             """
-            if not (sender_router in self.routing_table.keys()):
+            if not (sender_router in self.routing_table):
                 for router, route in self.output_ports.items():
                     if sender_router == router:
-                        self.routing_table[sender_router] = (route[INDEX_OF_LINK_COST], sender_router, 0, 0)
+                        self.update_route(sender_router,
+                        route[INDEX_OF_LINK_COST], sender_router)
                         break
+            # Every route learned from the sender goes over the link to it
+            link_cost = self.output_ports[sender_router][INDEX_OF_LINK_COST]
             for router, route_info in advertised_routing_table.items():
                 # update the route cost from sender router to this router
                 if router == self.router_id:
-                    new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST]
-                    self.routing_table[sender_router] = (new_cost, sender_router, 0,
-                    0)
+                    # The sender's own distance back may be a longer path, the
+                    # link cost is the cost of the direct route
+                    sender_route = self.routing_table[sender_router]
+                    if(sender_route.next_hop == sender_router or
+                    sender_route.cost > link_cost):
+                        self.update_route(sender_router, link_cost, sender_router)
                 else:
                     # This router already have this route
-                    if router in self.routing_table.keys():
+                    if router in self.routing_table:
                         # This route learned from the sender router, must update
-                        if self.routing_table[router][INDEX_OF_NEXT_HOP] == sender_router:
-                            new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST] + self.routing_table[sender_router][INDEX_OF_LINK_COST]
+                        if self.routing_table[router].next_hop == sender_router:
+                            new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST] + link_cost
                             # If the new cost is greater than 16, change the new cost
                             #equal to 16
                             if new_cost > MAX_LINK_COST:
                                 new_cost = MAX_LINK_COST
-                            if new_cost == MAX_LINK_COST:
-                                self.routing_table[router] = (new_cost, sender_router,
-                                0, self.routing_table[router][INDEX_OF_D_TIMEOUT])
-                            else:
-                                self.routing_table[router] = (new_cost, sender_router,
-                                0, 0)
+                            self.update_route(router, new_cost, sender_router)
                         else:
                             # Check if has a new route to destination router
-                            old_cost = self.routing_table[router][INDEX_OF_LINK_COST]
-                            new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST] + self.routing_table[sender_router][INDEX_OF_LINK_COST]
+                            old_cost = self.routing_table[router].cost
+                            new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST] + link_cost
                             if old_cost > new_cost:
-                                self.routing_table[router] = (new_cost, sender_router,
-                                0, 0)
+                                self.update_route(router, new_cost, sender_router)
                     else:
                         # This route is not in the router's routing table,add this
                         # route to routing table
-                        new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST] + self.routing_table[sender_router][INDEX_OF_LINK_COST]
+                        new_cost = advertised_routing_table[router][INDEX_OF_LINK_COST] + link_cost
                         if new_cost < MAX_LINK_COST:
-                            self.routing_table[router] = (new_cost, sender_router, 0,
-                            0)
+                            self.update_route(router, new_cost, sender_router)
         # Check if the old routing table is same or not as the new routing table.
-        if old_routing_table != self.routing_table:
-            print("Advertise routing table: There are Changes in routing table")
-            self.advertise_routing_table()
-    def print_routing_table(self, routing_table):
+        if old_version != self.routing_table.version:
+            self.logger.info("Advertise routing table: There are Changes in "
+            "routing table")
+            self.trigger_update()
+        self.metrics.observe("calculate_routing_table", time.perf_counter() -
+        started)
+    def log_routing_table(self, limiter, title, routing_table):
         """
-        :param routing_table:
-        :return:
+        Log a routing table at DEBUG level, rate limited by limiter. Only a
+        snapshot of the rows is taken here, the table is formatted by the log
+        writer thread.
+        :param limiter: RateLimiter
+        :param title:
+        :param routing_table: RouteTable or a received routing table
         """
-        print("-"*55)
-        print("{0:1s}{1:9s}{2:1s}{3:9s}{4:1s}{5:9s}{6:1s}{7:10s}{8:1s}{9:10s}{10:1s}".format("|", "Dst", "|", "Cst", "|","Hop", "|", "Timeout", "|", "Garbage Collection", "|"))
-        print("-"*55)
+        if not self.logger.isEnabledFor(logging.DEBUG) or not limiter.allow():
+            return
+        self.logger.debug("%s", RoutingTableDump(title,
+        self.routing_table_rows(routing_table)))
+    def routing_table_rows(self, routing_table):
+        """
+        :param routing_table: RouteTable or a received routing table
+        :return: list of (dst, cst, nexthop, g_timeout, d_timeout)
+        """
+        rows = []
         for key, value in routing_table.items():
-            cost = value[INDEX_OF_LINK_COST]
-            hop = value[INDEX_OF_NEXT_HOP]
-            g_timeout = value[INDEX_OF_G_TIMEOUT]
-            d_timeout = value[INDEX_OF_D_TIMEOUT]
-            print("{0:1s}{1:9d}{2:1s}{3:9d}{4:1s}{5:9d}{6:1s}{7:10d}{8:1s}{9:10d}{10:1s}".format("|", key, "|", cost, "|", hop, "|", g_timeout, "|", d_timeout , "|"))
-            print("-"*55)
+            if isinstance(value, Route):
+                cost = value.cost
+                hop = value.next_hop
+                g_timeout, d_timeout = self.route_timer_values(value.g_timeout,
+                value.d_timeout)
+            else:
+                # A received routing table carries no timers
+                cost = value[INDEX_OF_LINK_COST]
+                hop = value[INDEX_OF_NEXT_HOP]
+                g_timeout = 0
+                d_timeout = 0
+            rows.append((key, cost, hop, g_timeout, d_timeout))
+        return rows
     def handle_RIP_packet(self, packet):
         """
         Handle rip packet
-        :param packet:
+        :param packet: RIPPacket returned by incoming_packet_check
+        :return: bool, False if the packet was dropped
         """
-        source_router_id, destination_router_id, command = self.unpack_common_RIP_packet(packet)
         # This packet belong to this router to handle
-        if destination_router_id == self.router_id:
+        if packet.destination_router_id == self.router_id:
             # Calculate routing table
-            if command == COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE:
-                self.calculate_routing_table(source_router_id,
-                self.unpack_routing_table(packet))
+            if packet.command == COMMAND_VALUE_FOR_UPDATE_ROUTING_TABLE:
+                # Routes are only learned over a configured link
+                if packet.source_router_id not in self.output_ports:
+                    return False
+                self.calculate_routing_table(packet.source_router_id,
+                packet.routing_table)
+                return True
+            # Every request is answered with the whole routing table
+            return self.answer_request(packet.source_router_id)
         # Forward this packet to destination router
-        else:
-            self.send_message_to_destination(destination_router_id, packet)
+        return self.send_message_to_destination(packet.destination_router_id,
+        packet.raw)
     def incoming_packet_check(self, pkt):
-        version_id = int(pkt.decode("utf-8")[0:4], 2)
-        if(version_id != 2):
-            return False
-        source_router_id = int(pkt.decode("utf-8")[4:20], 2)
-        if(source_router_id < 1 or source_router_id > 64000):
-            return False
-        destination_router_id = int(pkt.decode("utf-8")[20:36], 2)
-        if(destination_router_id < 1 or destination_router_id > 64000):
-            return False
-        command = int(pkt.decode("utf-8")[36:40], 2)
-        if(command != 1):
-            return False
-        routing_table_string = pkt.decode("utf-8")[40:]
-        routing_table = ast.literal_eval(routing_table_string)
-        for router_id in routing_table.keys():
-            matric = routing_table[router_id][0]
-            if(matric > 16 or matric < 0):
-                return False
-        return True
+        """
+        Validate and decode a received packet in a single pass.
+        :param pkt: received buffer
+        :return: RIPPacket, or None if the packet is invalid
+        """
+        return rip_packet.parse_packet(pkt, VALID_COMMANDS)
     def switch_on_router(self):
         """
         Switch the router on
@@ -357,19 +693,153 @@ class Router:
         print("Common Command:")
         print("2:Print routing table: format(2-dst)\n")
         print("-"*55)
+        self.start()
+        try:
+            self.scheduler.run_forever()
+        except KeyboardInterrupt:
+            print("Keyboard Interrupt")
+    def start(self):
+        """
+        Attach the transport and register the timers of this router on its
+        event loop without running the loop, so that several routers can share
+        one scheduler.
+        """
         self.initialise_routing_table()
-        self.advertise_routing_table()
-        self.timer_for_router()
-        rlist = list(self.sockets.values())
-        wlist = []
-        xlist = []
-        while True:
-            readable, writable, exceptions = select.select(rlist, wlist, xlist)
-            for task in readable:
-                # Task is socket
-                if task in self.sockets.values():
-                    for socket_instance in self.sockets.values():
-                        if socket_instance == task:
-                            packet, _ = socket_instance.recvfrom(1024)
-                            if self.incoming_packet_check(packet) == True:
-                                self.handle_RIP_packet(packet)
\ No newline at end of file
+        if self.snapshot_file is not None:
+            self.restore_snapshot()
+        self.transport.attach(self)
+        self.periodic_update()
+        self.request_routing_tables()
+        if self.stats_interval:
+            self.stats_timer = self.scheduler.call_later(self.stats_interval,
+            self.log_stats)
+    def apply_config(self, input_ports, output_ports):
+        """
+        Apply a new configuration to the running router, changing only what
+        differs from the current one.
+        1.New input ports are bound and removed ones are closed.
+        2.Routes through a removed neighbour become unreachable.
+        3.When the cost of a link changes, the cost of every route through that
+        neighbour changes by the same amount. The neighbour is asked for its
+        table when the link gets cheaper, since other routes through it may
+        become the best ones.
+        4.New neighbours, and neighbours whose link got cheaper, are reached
+        through the link when it is shorter than the current route. New
+        neighbours are asked for their table and sent this router's.
+        The changed routes are sent in one triggered update.
+        :param input_ports:
+        :param output_ports: dict: {dst,(cst, port)}
+        :return: bool, True if anything changed
+        """
+        old_version = self.routing_table.version
+        new_input_ports = set(input_ports)
+        old_input_ports = set(self.input_ports)
+        bound_ports = []
+        for port in self.input_ports:
+            if port in new_input_ports:
+                bound_ports.append(port)
+            else:
+                self.transport.remove_input_port(port)
+        for port in input_ports:
+            if port in old_input_ports:
+                continue
+            try:
+                self.transport.add_input_port(port)
+            except OSError as error:
+                self.logger.error("Can not bind input port %d: %s", port, error)
+                continue
+            bound_ports.append(port)
+        changed = set(bound_ports) != old_input_ports
+        self.input_ports = bound_ports
+        old_output_ports = self.output_ports
+        removed = set(old_output_ports) - set(output_ports)
+        added = [router for router in output_ports if router not in
+        old_output_ports]
+        cost_changes = {}
+        for router, (cost, port) in output_ports.items():
+            if router in old_output_ports:
+                old_cost, old_port = old_output_ports[router]
+                if cost != old_cost:
+                    cost_changes[router] = cost - old_cost
+                changed = changed or cost != old_cost or port != old_port
+        changed = changed or bool(removed) or bool(added)
+        self.output_ports = dict(output_ports)
+        for router in removed:
+            self.advertisement_cache.pop(router, None)
+            self.advertised_versions.pop(router, None)
+        if removed or cost_changes:
+            for dst, route in list(self.routing_table.items()):
+                if route.cost >= MAX_LINK_COST or dst == self.router_id:
+                    continue
+                if route.next_hop in removed:
+                    self.update_route(dst, MAX_LINK_COST, route.next_hop)
+                elif route.next_hop in cost_changes:
+                    # A route through the neighbour costs at least the link
+                    self.update_route(dst, max(route.cost + cost_changes[
+                    route.next_hop], output_ports[route.next_hop][
+                    INDEX_OF_LINK_COST]), route.next_hop)
+        cheaper = added + [router for router, delta in cost_changes.items() if
+        delta < 0]
+        # The link is used before the neighbour's answer arrives
+        for router in cheaper:
+            cost = output_ports[router][INDEX_OF_LINK_COST]
+            if(router not in self.routing_table or
+            self.routing_table[router].cost > cost):
+                self.update_route(router, cost, router)
+        self.rebuild_fib()
+        self.request_routing_tables(cheaper)
+        for router in added:
+            self.advertise_to(router)
+        if self.routing_table.version != old_version:
+            self.trigger_update()
+        self.logger.info("Configuration applied: input ports %s, neighbours "
+        "added %s, removed %s, link cost changes %s", self.input_ports,
+        sorted(added), sorted(removed), cost_changes)
+        return changed
+    def stop(self):
+        """
+        Cancel the timers of this router and close its transport
+        """
+        for timer in (self.periodic_update_timer, self.timeout_timer,
+        self.triggered_update_timer, self.stats_timer):
+            if timer is not None:
+                timer.cancel()
+        self.periodic_update_timer = None
+        self.timeout_timer = None
+        self.triggered_update_timer = None
+        self.stats_timer = None
+        self.transport.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+    def receive_datagram(self, port, packet):
+        """
+        Handle one datagram received by the transport
+        :param port: input port on which the datagram arrived
+        :param packet: memoryview of the datagram, only valid during this call
+        """
+        self.metrics.received_packets[port] += 1
+        self.metrics.received_bytes[port] += len(packet)
+        # Fast path: a packet for another router is forwarded from its header
+        destination = rip_packet.peek_destination(packet, VALID_COMMANDS)
+        if destination is None:
+            rip = None
+        elif destination != self.router_id:
+            if not self.send_message_to_destination(destination, packet):
+                self.metrics.dropped[port] += 1
+            return
+        else:
+            rip = self.incoming_packet_check(packet)
+        if rip is None:
+            self.metrics.validation_failures += 1
+            self.metrics.dropped[port] += 1
+        elif not self.handle_RIP_packet(rip):
+            self.metrics.dropped[port] += 1
+    def log_stats(self):
+        """
+        Log the metrics snapshot as JSON and schedule the next one
+        """
+        self.logger.info("Stats %s", json.dumps(self.metrics.snapshot(self),
+        sort_keys=True))
+        self.stats_timer = self.scheduler.call_later(self.stats_interval,
+        self.log_stats)
@@ -0,0 +1,208 @@
+"""
+This module describe the event loop which drives one or more routers from a
+single thread.
+- Basic fields
+1: selector, selectors.DefaultSelector (epoll on Linux), sockets waiting to be
+read, each registered with its own callback so a ready socket is dispatched
+without searching
+2: timers, list, min-heap of (when, sequence, TimerHandle) ordered by deadline
+3: signal_handlers,dict: {signum: (callback, args)}. The signal number is
+written to a socketpair by signal.set_wakeup_fd and the callback runs on the
+loop like a socket callback, never inside the signal handler.
+The loop waits on the selector until the earliest timer is due, runs the
+callbacks of the ready sockets and then every timer whose deadline has passed.
+Nothing runs concurrently, so callbacks can use the routing table without a
+lock.
+SimulatedScheduler runs the same timers on a virtual clock which jumps straight
+to the next deadline, for routers exchanging packets in memory.
+"""
+import selectors
+import heapq
+import itertools
+import signal
+import socket
+import time
+class TimerHandle:
+    """
+    A callback scheduled on the event loop, returned so it can be cancelled.
+    """
+    __slots__ = ("when", "callback", "args", "cancelled")
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+    def cancel(self):
+        """
+        Stop this callback from running
+        """
+        self.cancelled = True
+class Scheduler:
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.timers = []
+        self.sequence = itertools.count()
+        self.running = False
+        self.signal_handlers = {}
+        self.signal_socket = None
+        self.signal_writer = None
+    def time(self):
+        """
+        :return: current time of the event loop in seconds
+        """
+        return time.monotonic()
+    def call_at(self, when, callback, *args):
+        """
+        Run callback(*args) once the loop time reaches when
+        :param when:
+        :param callback:
+        :return: TimerHandle
+        """
+        handle = TimerHandle(when, callback, args)
+        heapq.heappush(self.timers, (when, next(self.sequence), handle))
+        return handle
+    def call_later(self, delay, callback, *args):
+        """
+        Run callback(*args) after delay seconds
+        :param delay:
+        :param callback:
+        :return: TimerHandle
+        """
+        return self.call_at(self.time() + delay, callback, *args)
+    def add_reader(self, file_object, callback, *args):
+        """
+        Run callback(*args) whenever file_object is readable
+        :param file_object:
+        :param callback:
+        """
+        self.selector.register(file_object, selectors.EVENT_READ, (callback,
+        args))
+    def remove_reader(self, file_object):
+        """
+        :param file_object:
+        """
+        self.selector.unregister(file_object)
+    def add_signal_handler(self, signum, callback, *args):
+        """
+        Run callback(*args) on the loop whenever signum is received. Only the
+        main thread can install signal handlers.
+        :param signum:
+        :param callback:
+        """
+        if self.signal_socket is None:
+            self.signal_socket, self.signal_writer = socket.socketpair()
+            self.signal_socket.setblocking(False)
+            self.signal_writer.setblocking(False)
+            signal.set_wakeup_fd(self.signal_writer.fileno())
+            self.add_reader(self.signal_socket, self.run_signal_handlers)
+        self.signal_handlers[signum] = (callback, args)
+        # The wakeup fd is only written if a Python handler is installed
+        signal.signal(signum, lambda received, frame: None)
+    def remove_signal_handler(self, signum):
+        """
+        Restore the default action of signum
+        :param signum:
+        """
+        if self.signal_handlers.pop(signum, None) is not None:
+            signal.signal(signum, signal.SIG_DFL)
+    def run_signal_handlers(self):
+        """
+        Run the callbacks of the signals received since the last call
+        """
+        try:
+            received = self.signal_socket.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        for signum in received:
+            handler = self.signal_handlers.get(signum)
+            if handler is not None:
+                handler[0](*handler[1])
+    def next_deadline(self):
+        """
+        :return: deadline of the earliest timer, None if there is none
+        """
+        while self.timers and self.timers[0][2].cancelled:
+            heapq.heappop(self.timers)
+        if not self.timers:
+            return None
+        return self.timers[0][0]
+    def next_timeout(self):
+        """
+        :return: seconds until the earliest timer is due, None if there is none
+        """
+        next_deadline = self.next_deadline()
+        if next_deadline is None:
+            return None
+        return max(0, next_deadline - self.time())
+    def run_due_timers(self):
+        """
+        Run every timer whose deadline has passed
+        """
+        now = self.time()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, handle = heapq.heappop(self.timers)
+            if not handle.cancelled:
+                handle.callback(*handle.args)
+    def run_once(self):
+        """
+        Wait for ready sockets or the earliest timer and run their callbacks
+        """
+        events = self.selector.select(self.next_timeout())
+        registered = self.selector.get_map()
+        for key, _ in events:
+            # A callback of this batch may have unregistered a later file
+            # object, e.g. a reload closing an input port
+            if registered.get(key.fd) is not key:
+                continue
+            callback, args = key.data
+            callback(*args)
+        self.run_due_timers()
+    def run_forever(self):
+        """
+        Run the event loop until stop is called
+        """
+        self.running = True
+        while self.running:
+            self.run_once()
+    def stop(self):
+        """
+        Stop the event loop after the current iteration
+        """
+        self.running = False
+class SimulatedScheduler(Scheduler):
+    """
+    Event loop on a virtual clock. Instead of waiting, the clock is moved to the
+    deadline of the next timer, so simulated time runs as fast as the callbacks
+    allow. Sockets can not be registered, routers use a MemoryTransport.
+    """
+    def __init__(self, start=0.0):
+        Scheduler.__init__(self)
+        self.now = start
+    def time(self):
+        return self.now
+    def add_reader(self, file_object, callback, *args):
+        raise TypeError("SimulatedScheduler has no sockets")
+    def run_once(self):
+        """
+        Move the clock to the earliest timer and run every timer due then, stop
+        the loop if there is none
+        """
+        next_deadline = self.next_deadline()
+        if next_deadline is None:
+            self.running = False
+            return
+        self.now = max(self.now, next_deadline)
+        self.run_due_timers()
+    def run_until(self, when):
+        """
+        Run every timer due up to when and leave the clock at when
+        :param when:
+        """
+        self.running = True
+        while self.running:
+            next_deadline = self.next_deadline()
+            if next_deadline is None or next_deadline > when:
+                break
+            self.now = max(self.now, next_deadline)
+            self.run_due_timers()
+        self.now = max(self.now, when)
@@ -0,0 +1,114 @@
+"""
+This module runs many routers in one process.
+Every router is built from a configure file in the config_file_reader format,
+all of them share one SimulatedScheduler and exchange packets through a
+MemoryNetwork instead of UDP sockets, so simulated time runs much faster than
+wall-clock time.
+Usage: python simulator.py conf1.txt conf2.txt ... [--duration 120]
+[--latency 0.01] [--loss 0.0] [--seed 1]
+or: python simulator.py --topology topology.txt [--duration 120] ...
+"""
+import argparse
+import random
+import config_file_reader
+import router
+from scheduler import SimulatedScheduler
+from transport import MemoryNetwork
+from rip_logging import RoutingTableDump
+SIMULATION_DURATION = 120
+class Simulator:
+    """
+    - Basic fields
+    1: scheduler,SimulatedScheduler, shared by every router
+    2: network,MemoryNetwork
+    3: routers,dict: {router_id: Router}
+    """
+    def __init__(self, configs, latency=0.0, loss=0.0, seed=None,
+    **router_options):
+        """
+        :param configs: list of [router_id, input_ports, outputs] as returned by
+        config_file_reader.get_file_info
+        :param latency: seconds between sending and delivering a packet
+        :param loss: probability of losing a packet
+        :param seed: seed of the random timers and of packet loss
+        :param router_options: extra keyword arguments of every Router
+        """
+        if seed is not None:
+            random.seed(seed)
+        self.scheduler = SimulatedScheduler()
+        self.network = MemoryNetwork(self.scheduler, latency, loss, seed)
+        self.routers = {}
+        for router_id, input_ports, outputs in configs:
+            if router_id in self.routers:
+                raise ValueError("Router ID {0:d} is used twice".format(router_id))
+            self.routers[router_id] = router.Router(router_id, input_ports,
+            outputs, scheduler=self.scheduler, transport=self.network.transport(),
+            **router_options)
+    @classmethod
+    def from_config_files(cls, file_names, **options):
+        """
+        :param file_names: configure files, each describing one or more routers
+        :param options: keyword arguments of Simulator
+        :return: Simulator
+        :raise config_file_reader.ConfigError:
+        """
+        configs = []
+        for file_name in file_names:
+            configs.extend(config_file_reader.read_topology(file_name).values())
+        return cls(configs, **options)
+    def start(self):
+        """
+        Start every router
+        """
+        for new_router in self.routers.values():
+            new_router.start()
+    def run(self, duration):
+        """
+        Run the simulation for duration simulated seconds
+        :param duration:
+        """
+        self.scheduler.run_until(self.scheduler.time() + duration)
+    def stop_router(self, router_id):
+        """
+        Switch one router off, its neighbours stop hearing from it
+        :param router_id:
+        """
+        self.routers[router_id].stop()
+    def set_link_loss(self, router_a, router_b, loss):
+        """
+        Set the loss of both directions of the link between two routers
+        :param router_a:
+        :param router_b:
+        :param loss: 1 fails the link, None restores the network default
+        """
+        self.network.set_link(self.routers[router_a].output_ports[router_b][
+        router.INDEX_OF_NEXT_HOP], loss=loss)
+        self.network.set_link(self.routers[router_b].output_ports[router_a][
+        router.INDEX_OF_NEXT_HOP], loss=loss)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate many RIP routers "
+    "in one process")
+    parser.add_argument("config_files", nargs="*")
+    parser.add_argument("--topology", metavar="FILE",
+    help="topology file describing many routers")
+    parser.add_argument("--duration", type=float, default=SIMULATION_DURATION,
+    help="simulated seconds")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    file_names = args.config_files + ([args.topology] if args.topology else [])
+    if not file_names:
+        parser.error("give configure files or --topology")
+    simulator = Simulator.from_config_files(file_names, latency=args.latency,
+    loss=args.loss, seed=args.seed)
+    simulator.start()
+    simulator.run(args.duration)
+    for router_id in sorted(simulator.routers.keys()):
+        simulated_router = simulator.routers[router_id]
+        print(RoutingTableDump("----->Routing table for router {0:d}".format(
+        router_id), simulated_router.routing_table_rows(
+        simulated_router.routing_table)))
+    print("Packets sent: {0:d}, bytes sent: {1:d}, packets lost: {2:d}".format(
+    simulator.network.packets_sent, simulator.network.bytes_sent,
+    simulator.network.packets_lost))
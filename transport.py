@@ -0,0 +1,207 @@
+"""
+This module describe how routers exchange packets.
+A transport is attached to one router when the router starts. It receives the
+datagrams sent to the router's input ports and hands each one to
+router.receive_datagram(port, packet), and sends packets to the input port of
+a neighbour with send(port, packet).
+- UDPTransport, one UDP socket per input port on 127.0.0.1, registered on the
+router's scheduler
+- MemoryNetwork and MemoryTransport, many routers sharing one scheduler and
+exchanging packets through in-memory queues, with optional latency and loss
+"""
+import socket
+import random
+import rip_packet
+RECEIVE_BATCH_LIMIT = 256
+class UDPTransport:
+    """
+    - Basic fields
+    1: address, 127.0.0.1
+    2: sockets, dict: {port: socket}, specify the socket and the binded port. The
+    sockets are non-blocking and registered on the scheduler with their port.
+    3: sender,socket, do the sending work
+    """
+    def __init__(self, address="127.0.0.1"):
+        self.address = address
+        self.router = None
+        self.sockets = {}
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Every datagram is decoded from this buffer before the next one is read
+        self.receive_buffer = bytearray(rip_packet.MAX_PACKET_SIZE)
+        self.receive_view = memoryview(self.receive_buffer)
+    def attach(self, router):
+        """
+        Creates as many UDP sockets as the router has input ports and binds one
+        socket to each port.
+        :param router:
+        """
+        self.router = router
+        for port in router.input_ports:
+            self.add_input_port(port)
+    def add_input_port(self, port):
+        """
+        :param port:
+        """
+        socket_instance = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        socket_instance.bind((self.address, port))
+        socket_instance.setblocking(False)
+        self.sockets[port] = socket_instance
+        self.router.scheduler.add_reader(socket_instance, self.receive_packets,
+        port, socket_instance)
+    def remove_input_port(self, port):
+        """
+        :param port:
+        """
+        socket_instance = self.sockets.pop(port)
+        self.router.scheduler.remove_reader(socket_instance)
+        socket_instance.close()
+    def send(self, port, packet):
+        """
+        :param port: input port of the neighbour
+        :param packet:
+        """
+        self.sender.sendto(packet, (self.address, port))
+    def receive_packets(self, port, socket_instance):
+        """
+        Read every datagram waiting on a ready input socket, up to
+        RECEIVE_BATCH_LIMIT, into the reusable receive buffer and hand them to
+        the router. Datagrams left over are read on the next wakeup since the
+        socket stays readable.
+        :param port: input port of the socket
+        :param socket_instance:
+        """
+        if self.sockets.get(port) is not socket_instance:
+            # The port was removed since the socket became ready
+            return
+        for _ in range(RECEIVE_BATCH_LIMIT):
+            try:
+                nbytes, _ = socket_instance.recvfrom_into(self.receive_buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionError:
+                # An ICMP error from an earlier sendto, the socket is still usable
+                continue
+            self.router.receive_datagram(port, self.receive_view[:nbytes])
+    def close(self):
+        """
+        Close every socket
+        """
+        for port in list(self.sockets.keys()):
+            self.remove_input_port(port)
+        self.sender.close()
+class MemoryNetwork:
+    """
+    In-memory network shared by every router of a simulation.
+    - Basic fields
+    1: scheduler, the scheduler shared by the routers, usually a
+    SimulatedScheduler
+    2: latency,float, default seconds between sending and delivering a packet
+    3: loss,float, default probability of losing a packet
+    4: links,dict: {port: (latency, loss)}, overrides for the packets sent to
+    one input port, that is for one direction of one link
+    5: receivers,dict: {port: router}
+    6: packets_sent, bytes_sent, packets_lost, packets_delivered count every
+    packet sent
+    """
+    def __init__(self, scheduler, latency=0.0, loss=0.0, seed=None):
+        self.scheduler = scheduler
+        self.latency = latency
+        self.loss = loss
+        self.links = {}
+        self.receivers = {}
+        self.random = random.Random(seed)
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_lost = 0
+        self.packets_delivered = 0
+    def transport(self):
+        """
+        :return: a new MemoryTransport on this network
+        """
+        return MemoryTransport(self)
+    def set_link(self, port, latency=None, loss=None):
+        """
+        Override latency and loss for the packets sent to port
+        :param port:
+        :param latency: None keeps the network default
+        :param loss: None keeps the network default
+        """
+        self.links[port] = (self.latency if latency is None else latency,
+        self.loss if loss is None else loss)
+    def bind(self, port, router):
+        """
+        :param port:
+        :param router:
+        """
+        if port in self.receivers:
+            raise OSError("Port {0:d} is already bound".format(port))
+        self.receivers[port] = router
+    def unbind(self, port):
+        """
+        :param port:
+        """
+        self.receivers.pop(port, None)
+    def send(self, port, packet):
+        """
+        Queue a copy of the packet for delivery to port
+        :param port:
+        :param packet:
+        """
+        latency, loss = self.links.get(port, (self.latency, self.loss))
+        self.packets_sent += 1
+        self.bytes_sent += len(packet)
+        if loss > 0 and self.random.random() < loss:
+            self.packets_lost += 1
+            return
+        self.scheduler.call_later(latency, self.deliver, port, bytes(packet))
+    def deliver(self, port, packet):
+        """
+        Hand a packet to the router bound to port, it is lost if there is none
+        :param port:
+        :param packet:
+        """
+        router = self.receivers.get(port)
+        if router is None:
+            self.packets_lost += 1
+            return
+        self.packets_delivered += 1
+        router.receive_datagram(port, memoryview(packet))
+class MemoryTransport:
+    """
+    Transport of one router on a MemoryNetwork
+    """
+    def __init__(self, network):
+        self.network = network
+        self.router = None
+        self.ports = set()
+    def attach(self, router):
+        """
+        :param router:
+        """
+        self.router = router
+        for port in router.input_ports:
+            self.add_input_port(port)
+    def add_input_port(self, port):
+        """
+        :param port:
+        """
+        self.network.bind(port, self.router)
+        self.ports.add(port)
+    def remove_input_port(self, port):
+        """
+        :param port:
+        """
+        self.network.unbind(port)
+        self.ports.discard(port)
+    def send(self, port, packet):
+        """
+        :param port: input port of the neighbour
+        :param packet:
+        """
+        self.network.send(port, packet)
+    def close(self):
+        """
+        Unbind every input port
+        """
+        for port in list(self.ports):
+            self.remove_input_port(port)